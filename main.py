@@ -1,24 +1,63 @@
-from tenacity import retry, stop_after_attempt, wait_exponential
-import asyncio
+import os
+
 import typer
 from rich import print as rich_print
-from src.agent.chart_agent import ChartAgent
-from src.utils.file_handler import FileHandler
 
 app = typer.Typer()
-chart_agent = ChartAgent()
-file_handler = FileHandler()
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+# Heavy dependencies (pandas, openai, tenacity) are imported on first use
+# so that --help and argument errors return immediately
+_session = None
+
+def get_session():
+    """
+    Create the persistent chart session on first use
+    """
+    global _session
+    if _session is None:
+        from src.agent.chart_session import ChartSession
+        _session = ChartSession()
+    return _session
+
+def forward_to_daemon(action: str, **params) -> bool:
+    """
+    Run the action in a running daemon, if any. Returns False when there is no daemon.
+    """
+    from src.api.daemon import DaemonClient
+    
+    result = DaemonClient().request(action, **params)
+    if result is None:
+        return False
+    
+    if result.get("status") == "success":
+        rich_print(f"[green]Chart saved successfully at: {result['output_path']}[/green]")
+    else:
+        rich_print(f"[red]Error: {result.get('detail')}[/red]")
+    for question in result.get("candidate_questions", []):
+        rich_print(f"  - {question}")
+    return True
+
 async def async_process_file(data, command):
     """
     Async wrapper for processing file with retry logic
     """
+    from tenacity import retry, stop_after_attempt, wait_exponential
+    
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    async def process_with_retry():
+        return await _process_file(data, command)
+    
+    return await process_with_retry()
+
+async def _process_file(data, command):
+    """
+    Process the file once, raising if no configuration was generated
+    """
     try:
-        chart_config = await chart_agent.process_command(data, command)
-        if not chart_config:
+        response = await get_session().process_command(data, command)
+        if not response.get("chart_config"):
             raise ValueError("No chart configuration generated")
-        return chart_config
+        return response
     except Exception as e:
         rich_print(f"[yellow]Retrying due to error: {str(e)}[/yellow]")
         raise
@@ -31,39 +70,45 @@ def process_file(
     """
     Process a file and generate a chart based on the command
     """
+    import asyncio
+    
     try:
-        # Load and process the file
-        rich_print("[yellow]Loading file...[/yellow]")
-        data = file_handler.load_file(file_path)
-        
-        rich_print("[yellow]Processing command with AI...[/yellow]")
-        
-        # Create new event loop for async operation
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        # The daemon runs in its own working directory
+        if forward_to_daemon("process_file", file_path=os.path.abspath(file_path), command=command):
+            return
         
-        try:
-            # Run the async operation with a timeout
-            chart_config = loop.run_until_complete(
-                asyncio.wait_for(async_process_file(data, command), timeout=60)
-            )
+        from src.utils.tracing import tracer
+        with tracer.trace("cli.process_file", command=command):
+            session = get_session()
             
-            if not chart_config:
-                raise ValueError("No chart configuration was generated")
+            # Load and process the file, reusing the local dataset cache
+            rich_print("[yellow]Loading file...[/yellow]")
+            data = session.load_file(file_path)
+            
+            rich_print("[yellow]Processing command with AI...[/yellow]")
+            
+            # Create new event loop for async operation
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            
+            try:
+                # Each model request is bounded by its tier timeout, including escalations and fixes
+                response = loop.run_until_complete(async_process_file(data, command))
+                chart_config = response.get("chart_config")
+            
+                if not chart_config:
+                    raise ValueError("No chart configuration was generated")
                 
-            rich_print("[green]Chart configuration generated successfully[/green]")
-            rich_print("Configuration:", chart_config)
+                rich_print("[green]Chart configuration generated successfully[/green]")
+                rich_print("Configuration:", chart_config)
             
-            # Save and display the chart
-            rich_print("[yellow]Saving chart...[/yellow]")
-            output_path = file_handler.save_chart(chart_config)
-            rich_print(f"[green]Chart saved successfully at: {output_path}[/green]")
+                # Save and display the chart
+                rich_print("[yellow]Saving chart...[/yellow]")
+                output_path = session.file_handler.save_chart(chart_config)
+                rich_print(f"[green]Chart saved successfully at: {output_path}[/green]")
             
-        except asyncio.TimeoutError:
-            rich_print("[red]Operation timed out after 60 seconds[/red]")
-            raise
-        finally:
-            loop.close()
+            finally:
+                loop.close()
             
     except (ValueError, TypeError, FileNotFoundError) as e:  # Specify relevant exceptions
         rich_print(f"[red]Error: {str(e)}[/red]")
@@ -75,17 +120,57 @@ def update_chart(
     """
     Update the existing chart based on new commands
     """
+    import asyncio
+    
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        updated_config = loop.run_until_complete(chart_agent.update_chart(command))
-        loop.close()
-        
-        output_path = file_handler.save_chart(updated_config)
-        rich_print(f"[green]Chart updated successfully at: {output_path}[/green]")
+        if forward_to_daemon("update_chart", command=command):
+            return
         
+        from src.utils.tracing import tracer
+        with tracer.trace("cli.update_chart", command=command):
+            # The chart state of the previous invocation is restored from the state directory
+            session = get_session()
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            response = loop.run_until_complete(session.update_chart(command))
+            loop.close()
+            
+            updated_config = response.get("chart_config")
+            if not updated_config:
+                raise ValueError("No chart configuration was generated")
+            
+            output_path = session.file_handler.save_chart(updated_config)
+            rich_print(f"[green]Chart updated successfully at: {output_path}[/green]")
+            
     except Exception as e:
         rich_print(f"[red]Error: {str(e)}[/red]")
 
+@app.command()
+def daemon():
+    """
+    Run a local daemon that keeps the agent and datasets warm for later CLI calls
+    """
+    import asyncio
+    from src.api.daemon import ChartDaemon
+    
+    chart_daemon = ChartDaemon()
+    rich_print(f"[green]Chart daemon running, state in {chart_daemon.store.state_dir}. Press Ctrl+C to stop.[/green]")
+    try:
+        asyncio.run(chart_daemon.serve())
+    except KeyboardInterrupt:
+        pass
+
+@app.command()
+def stop_daemon():
+    """
+    Stop the running local daemon
+    """
+    from src.api.daemon import DaemonClient
+    
+    if DaemonClient().request("shutdown") is None:
+        rich_print("[yellow]No daemon is running[/yellow]")
+    else:
+        rich_print("[green]Daemon stopped[/green]")
+
 if __name__ == "__main__":
     app() 
\ No newline at end of file
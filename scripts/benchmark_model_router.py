@@ -0,0 +1,36 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agent.model_router import ModelRouter
+
+# Routing accuracy on the labeled requests is checked by tests/test_model_router.py
+from tests.test_model_router import LABELED_REQUESTS
+
+
+def benchmark(router, iterations=20000):
+    """Measure the time per routing decision"""
+    requests = [([{"x": 0}] * rows, command, is_update) for command, rows, is_update, _ in LABELED_REQUESTS]
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        data, command, is_update = requests[i % len(requests)]
+        router.route(command, data, is_update=is_update)
+    elapsed = time.perf_counter() - start
+
+    print(f"route: {elapsed / iterations * 1e6:.1f} µs per request over {iterations} requests")
+    return elapsed / iterations
+
+
+def main():
+    """Measure the speed of model routing with the configured thresholds"""
+    router = ModelRouter.from_env()
+    per_request = benchmark(router)
+    if per_request > 1e-3:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import gzip
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from src.api.responses import FastJSONResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_preview(rows=20000):
+    """Data preview as returned by /upload for a large table"""
+    np.random.seed(42)
+    df = pd.DataFrame({
+        'Date': pd.date_range('2020-01-01', periods=rows, freq='h'),
+        'Region': np.random.choice(['North', 'South', 'East', 'West'], rows),
+        'Revenue': np.random.normal(50000, 10000, rows).round(2),
+        'Units_Sold': np.random.randint(50, 300, rows),
+        'Cost': np.random.normal(30000, 5000, rows).round(2),
+        'Returned': np.random.rand(rows) < 0.05
+    })
+    return {"status": "success", "filename": "large.csv", "preview": df.to_dict()}
+
+
+def build_config(datasets=5, points=5000):
+    """Chart config as returned by /process for a dense line chart"""
+    return {
+        "status": "success",
+        "config": {
+            "type": "line",
+            "data": {
+                "labels": [f"2023-01-01T{i % 24:02d}:00" for i in range(points)],
+                "datasets": [
+                    {
+                        "label": f"Series {d}",
+                        "data": np.random.normal(100, 15, points).round(3).tolist(),
+                        "borderColor": "rgba(54, 162, 235, 1)"
+                    }
+                    for d in range(datasets)
+                ]
+            },
+            "options": {"plugins": {"title": {"display": True, "text": "Dense series"}}}
+        },
+        "candidate_questions": ["Should the series be smoothed?"]
+    }
+
+
+def default_render(content):
+    """FastAPI's default path for a returned dict: jsonable_encoder, then JSONResponse"""
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast_render(content):
+    """Path used by the API endpoints"""
+    return FastJSONResponse(content).body
+
+
+def time_it(function, content, repeat=5):
+    """Best of several runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(content)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def report(name, content):
+    """Print serialization time and bytes on the wire for one payload"""
+    body = fast_render(content)
+    print(f"{name}:")
+    print(f"  default encoder   {time_it(default_render, content):8.1f} ms")
+    print(f"  FastJSONResponse  {time_it(fast_render, content):8.1f} ms")
+    print(f"  raw               {len(body) / 1024:8.1f} KiB")
+    print(f"  gzip              {len(gzip.compress(body, compresslevel=9)) / 1024:8.1f} KiB")
+    if brotli is not None:
+        print(f"  brotli            {len(brotli.compress(body, quality=4)) / 1024:8.1f} KiB")
+
+
+def main():
+    """Benchmark serialization and compression of large API payloads"""
+    report("Data preview (20000 rows x 6 columns)", build_preview())
+    report("Chart config (5 datasets x 5000 points)", build_config())
+
+
+if __name__ == "__main__":
+    main()
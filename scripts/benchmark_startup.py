@@ -0,0 +1,82 @@
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Entry points checked, with their cold start budget in milliseconds
+ENTRY_POINTS = {
+    "cli": (["main.py", "--help"], 350),
+    "api": (["-c", "import src.api.app"], 600)
+}
+
+# Modules that must not be imported until a chart is actually generated
+DEFERRED_MODULES = {"pandas", "openai", "numpy", "tenacity"}
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(args, runs):
+    """
+    Run an entry point under -X importtime and return the median import and wall times in ms,
+    plus the top-level modules it imported
+    """
+    import_times = []
+    wall_times = []
+    modules = set()
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "startup-benchmark"))
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        wall_times.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+
+        total = 0
+        for match in IMPORT_LINE.finditer(result.stderr):
+            cumulative, indent, module = int(match.group(2)), match.group(3), match.group(4)
+            modules.add(module.split(".")[0])
+            # Only top-level imports, nested ones are included in their parent's cumulative time
+            if len(indent) == 1:
+                total += cumulative
+        import_times.append(total / 1000)
+
+    return statistics.median(import_times), statistics.median(wall_times), modules
+
+
+def main():
+    """Fail if a cold start exceeds its budget or imports deferred modules"""
+    parser = argparse.ArgumentParser(description="Measure CLI and API cold start time")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per entry point, the median is reported")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget, e.g. for slow CI machines")
+    options = parser.parse_args()
+
+    failed = False
+    for name, (args, budget) in ENTRY_POINTS.items():
+        import_ms, wall_ms, modules = measure(args, options.runs)
+        budget_ms = budget * options.scale
+        eager = sorted(modules & DEFERRED_MODULES)
+
+        status = "ok"
+        if import_ms > budget_ms or eager:
+            status = "FAIL"
+            failed = True
+        print(f"{name}: imports {import_ms:.0f} ms, wall {wall_ms:.0f} ms, budget {budget_ms:.0f} ms [{status}]")
+        if eager:
+            print(f"  imported at startup: {', '.join(eager)}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Accuracy on the labeled commands is checked by tests/test_topic_manager.py
+from tests.test_topic_manager import LABELED_COMMANDS, build_manager
+
+
+def benchmark(iterations=20000):
+    """Measure the time per is_new_topic call"""
+    managers = [
+        (build_manager(topic_command, title, dataset_labels), command)
+        for topic_command, title, dataset_labels, command, _ in LABELED_COMMANDS
+    ]
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        manager, command = managers[i % len(managers)]
+        manager.is_new_topic(command)
+    elapsed = time.perf_counter() - start
+
+    print(f"is_new_topic: {elapsed / iterations * 1e6:.1f} µs per command over {iterations} commands")
+    return elapsed / iterations
+
+
+def main():
+    """Measure the speed of topic change detection"""
+    per_command = benchmark()
+    if per_command > 1e-3:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
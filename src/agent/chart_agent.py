@@ -1,41 +1,170 @@
 import json
-from typing import Dict, Any, List
-from openai import AsyncOpenAI
+from typing import Dict, Any, List, Optional, Tuple
 import os
-from dotenv import load_dotenv
 from .topic_manager import TopicManager
+from .conversation_memory import ConversationMemory
+from .model_router import ModelRouter, ModelTier
 import asyncio
-import pandas as pd
+import time
+from src.utils.aggregate_index import AggregateIndex
+from src.utils.chart_schema import validate_chart_config
+from src.utils.json_repair import TRUNCATED, parse_json
+from src.utils.serialization import dumps
+from src.utils.tracing import tracer
+
+SYSTEM_MESSAGE = """You are a Chart.js configuration expert and a data analysis assistant. Your role is to:
+1. Analyze both the input data structure and the semantic context of the data.
+2. Classify data types (numerical, categorical, temporal) and understand their real-world meaning.
+3. Transform data precisely according to user requests, ensuring transformations align with both data types and contextual meaning.
+4. Generate valid Chart.js configurations based on the analysis of the data and the user's prompt.
+5. Please make sure that the chart_config is not None and has correct syntax.
+6. Always generate 3-5 candidate questions to clarify the user's intent. These questions should help narrow down the user's requirements and ensure accurate chart generation.
+7. Follow this exact JSON structure to include Chart.js configuration and clarification questions:
+    {
+        "chart_config": {
+            "type": "bar|line|pie|doughnut|radar|polarArea|bubble|scatter",
+            "data": {
+                "labels": ["label1", "label2", ...],
+                "datasets": [
+                    {
+                        "label": "Dataset Label",
+                        "data": [value1, value2, ...],
+                        "backgroundColor": ["color1", "color2", ...],
+                        "borderColor": ["color1", "color2", ...],
+                        // other dataset properties as needed
+                    }
+                ]
+            },
+            "options": {
+                "scales": {
+                    "x": {
+                        "title": {
+                            "display": true,
+                            "text": "X-Axis Label"
+                        }
+                    },
+                    "y": {
+                        "title": {
+                            "display": true,
+                            "text": "Y-Axis Label"
+                        }
+                    }
+                },
+                "plugins": {
+                    "title": {
+                        "display": true,
+                        "text": "Chart Title"
+                    },
+                    "legend": {
+                        "position": "top"
+                    }
+                },
+                // other chart options as needed
+            }
+        },
+        "candidate_questions": [
+            "Question 1?",
+            "Question 2?",
+            "Question 3?"
+        ]
+    }
+
+8. Ensure all JSON keys and values use double quotes, not single quotes.
+9. For color values, use standard CSS color names, hex codes, or rgba() format.
+10. Include proper axis formatting with titles and scales appropriate to the data.
+11. Set sensible defaults for colors, labels, and other visual elements.
+12. For time-series data, use the appropriate time scale configuration.
+13. For time-based data, handle date formatting, support aggregations (daily→weekly→monthly→quarterly), calculate growth rates when requested and include moving averages if needed.
+14. For numerical data, calculate proper scales, handle aggregations, support multiple axes if needed and format numbers appropriately.
+15. For categorical data, group data correctly, calculate proportions if needed, sort data when appropriate and handle multiple categories.
+16. When given a list of SLIDE INTENTS instead of a COMMAND, generate one chart per intent and follow this JSON structure instead, keeping the slides in the same order as the intents and echoing each intent with its number:
+    {
+        "slides": [
+            {
+                "index": 1,
+                "intent": "Slide intent",
+                "chart_config": { ...Chart.js configuration as above... },
+                "candidate_questions": ["Question 1?", "Question 2?"]
+            }
+        ]
+    }
+17. For slides, limit candidate_questions to at most 2 per slide.
+18. When AGGREGATES are given, take grouped and rolled-up values from AGGREGATES instead of computing them from the rows; SAMPLE DATA shows only some of the rows. Groups that hold a single row list its "value" per column; use them for charts at the data's own granularity.
+"""
+
+# Slides generated per request; larger decks are split into concurrent batches
+DECK_BATCH_SIZE = 4
+DECK_TOKENS_PER_SLIDE = 1200
+MAX_COMPLETION_TOKENS = 4096
+
+# Datasets with more rows are sent with their aggregate cubes
+MAX_PROMPT_ROWS = 200
+# Rows of indexed datasets are sent in full up to this size, otherwise as a sample
+MAX_FULL_PROMPT_ROWS = 2000
+PROMPT_SAMPLE_ROWS = 20
+PROMPT_MAX_GROUPS = 60
 
 class ChartAgent:
     def __init__(self):
         # Load environment variables
+        from dotenv import load_dotenv
         load_dotenv()
         
         # Configure OpenAI API
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
+        self.api_key = os.getenv('OPENAI_API_KEY')
+        if not self.api_key:
             raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY in .env file")
-            
-        # Initialize AsyncOpenAI client with minimal configuration
-        self.client = AsyncOpenAI(
-            api_key=api_key
-        )
+        
+        # The client is created on first use so that startup does not import openai
+        self._client = None
+        self._tier_clients = {}
+        
+        # Model tiers and routing thresholds, optionally from CHATSLIDE_MODEL_CONFIG
+        self.router = ModelRouter.from_env()
         
         self.topic_manager = TopicManager()
+        self.memory = ConversationMemory()
         self.current_data = None
+        self.current_analysis = None
+        self.current_index = None
+        self.current_data_section = None
         self.current_config = None
         
+    @property
+    def client(self):
+        """AsyncOpenAI client, created on first request"""
+        if self._client is None:
+            from openai import AsyncOpenAI
+            
+            # Initialize AsyncOpenAI client with minimal configuration
+            self._client = AsyncOpenAI(
+                api_key=self.api_key
+            )
+        return self._client
+    
+    def _client_for(self, tier: ModelTier):
+        """Client for a tier; tiers with their own endpoint or key get a separate client"""
+        if tier.base_url is None and tier.api_key_env is None:
+            return self.client
+        
+        key = (tier.base_url, tier.api_key_env)
+        if key not in self._tier_clients:
+            from openai import AsyncOpenAI
+            
+            api_key = os.getenv(tier.api_key_env) if tier.api_key_env else self.api_key
+            self._tier_clients[key] = AsyncOpenAI(api_key=api_key or "none", base_url=tier.base_url)
+        return self._tier_clients[key]
+        
     async def process_command(self, data: Any, command: str) -> Dict:
         """
         Process a command and generate chart configuration
         """
         # Check if this is a new topic
         if self.topic_manager.is_new_topic(command):
-            self.current_config = None
+            self._reset_topic()
         
         # Store current data
-        self.current_data = data
+        self.set_data(data)
         
         # Prepare the context for the AI
         context = self._prepare_context(data, command)
@@ -53,10 +182,14 @@ class ChartAgent:
         # Store the current configuration
         if chart_config:
             self.current_config = chart_config
+            self.topic_manager.set_topic(command, chart_config)
+        self.memory.add_turn(command, chart_config)
         
         return {
             "chart_config": chart_config,
-            "candidate_questions": candidate_questions
+            "candidate_questions": candidate_questions,
+            "usage": response.get("usage"),
+            "routing": response.get("routing")
         }
     
     async def update_chart(self, command: str) -> Dict:
@@ -68,11 +201,12 @@ class ChartAgent:
             if self.current_data is None:
                 raise ValueError("No data available for update")
             
-            # Convert DataFrame to dict only if it's a DataFrame
-            data_dict = self.current_data.to_dict('records') if hasattr(self.current_data, 'to_dict') else self.current_data
+            # A command on a different subject starts a fresh chart instead of editing the stale one
+            if self.topic_manager.is_new_topic(command):
+                self._reset_topic()
             
             context = {
-                "data": data_dict,
+                "data": self.current_data,
                 "command": command,
                 "current_config": self.current_config
             }
@@ -88,14 +222,19 @@ class ChartAgent:
                 # Update current config if we got a new one
                 if chart_config:
                     self.current_config = chart_config
+                    self.topic_manager.set_topic(command, chart_config)
+                self.memory.add_turn(command, chart_config)
                     
                 return {
                     "chart_config": chart_config,
-                    "candidate_questions": candidate_questions
+                    "candidate_questions": candidate_questions,
+                    "usage": response.get("usage"),
+                    "routing": response.get("routing")
                 }
             else:
                 # Handle legacy format (just the config)
                 self.current_config = response
+                self.memory.add_turn(command, response)
                 return {
                     "chart_config": response,
                     "candidate_questions": []
@@ -104,140 +243,208 @@ class ChartAgent:
         except Exception as e:
             raise ValueError(f"Error updating chart: {str(e)}") from e
     
+    async def generate_deck(self, data: Any, intents: List[str]) -> Dict:
+        """
+        Generate an ordered deck of chart configurations, sending the data context once per batch
+        """
+        intents = [intent.strip() for intent in intents if intent and intent.strip()]
+        if not intents:
+            raise ValueError("No slide intents provided")
+        
+        # Store current data
+        self.set_data(data)
+        
+        data_section = self._create_data_section(data)
+        
+        # Batches share the same data prefix and run concurrently
+        batches = [intents[i:i + DECK_BATCH_SIZE] for i in range(0, len(intents), DECK_BATCH_SIZE)]
+        results = await asyncio.gather(
+            *(self._generate_deck_batch(data_section, batch) for batch in batches),
+            return_exceptions=True
+        )
+        
+        # A failed batch only loses its own slides
+        for position, (batch, result) in enumerate(zip(batches, results)):
+            if isinstance(result, Exception):
+                print(f"Error in deck batch: {str(result)}")
+                results[position] = ([
+                    {
+                        "intent": intent,
+                        "chart_config": None,
+                        "candidate_questions": [f"This slide could not be generated ({str(result)}). Could you try again?"]
+                    }
+                    for intent in batch
+                ], self._summarize_usage(None))
+            elif isinstance(result, BaseException):
+                raise result
+        
+        return {
+            "slides": [slide for batch_slides, _ in results for slide in batch_slides],
+            "usage": self._merge_usage([usage for _, usage in results])
+        }
+
+    def set_data(self, data: Any, analysis: Optional[Dict] = None, index: Optional[AggregateIndex] = None):
+        """
+        Set the current dataset, optionally with its precomputed structure analysis and aggregate index
+        """
+        if data is not self.current_data:
+            self.current_data = data
+            self.current_analysis = None
+            self.current_index = None
+            self.current_data_section = None
+        if analysis is not None:
+            self.current_analysis = analysis
+            self.current_data_section = None
+        if index is not None:
+            self.current_index = index
+            self.current_data_section = None
+
+    def export_state(self) -> Dict:
+        """
+        Export the conversation state (analysis, config, history, topic) as JSON-serializable data
+        """
+        return {
+            "analysis": self.current_analysis,
+            "current_config": self.current_config,
+            "memory": self.memory.to_dict(),
+            "topic": self.topic_manager.to_dict()
+        }
+
+    def restore_state(self, state: Dict, data: Any, index: Optional[AggregateIndex] = None):
+        """
+        Restore a conversation exported by export_state on top of its dataset
+        """
+        self.set_data(data, state.get("analysis"), index)
+        self.current_config = state.get("current_config")
+        self.memory.restore(state.get("memory", {}))
+        self.topic_manager.restore(state.get("topic", {}))
+
+    def _reset_topic(self):
+        """Drop the chart state and history of the previous topic"""
+        self.current_config = None
+        self.memory.reset()
+        self.topic_manager.reset()
+
     def _prepare_context(self, data: Any, command: str) -> Dict:
         """Prepare context for AI processing"""
-        # Convert DataFrame to dict only if it's a DataFrame
-        data_dict = data.to_dict('records') if hasattr(data, 'to_dict') else data
-        
+        # DataFrames are kept as-is; rows are only converted for the part of the data sent in the prompt
         return {
-            "data": data_dict,
+            "data": data,
             "command": command,
             "current_config": self.current_config
         }
     
-    async def _generate_config(self, context: Dict) -> Dict:
-        """Generate chart configuration using AI"""
-        try:
-            system_message = """You are a Chart.js configuration expert and a data analysis assistant. Your role is to:
-1. Analyze both the input data structure and the semantic context of the data.
-2. Classify data types (numerical, categorical, temporal) and understand their real-world meaning.
-3. Transform data precisely according to user requests, ensuring transformations align with both data types and contextual meaning.
-4. Generate valid Chart.js configurations based on the analysis of the data and the user's prompt.
-5. Please make sure that the chart_config is not None and has correct syntax.
-6. Always generate 3-5 candidate questions to clarify the user's intent. These questions should help narrow down the user's requirements and ensure accurate chart generation.
-7. Follow this exact JSON structure to include Chart.js configuration and clarification questions:
-    {
-        "chart_config": {
-            "type": "bar|line|pie|doughnut|radar|polarArea|bubble|scatter",
-            "data": {
-                "labels": ["label1", "label2", ...],
-                "datasets": [
-                    {
-                        "label": "Dataset Label",
-                        "data": [value1, value2, ...],
-                        "backgroundColor": ["color1", "color2", ...],
-                        "borderColor": ["color1", "color2", ...],
-                        // other dataset properties as needed
-                    }
-                ]
-            },
-            "options": {
-                "scales": {
-                    "x": {
-                        "title": {
-                            "display": true,
-                            "text": "X-Axis Label"
-                        }
-                    },
-                    "y": {
-                        "title": {
-                            "display": true,
-                            "text": "Y-Axis Label"
-                        }
-                    }
-                },
-                "plugins": {
-                    "title": {
-                        "display": true,
-                        "text": "Chart Title"
-                    },
-                    "legend": {
-                        "position": "top"
-                    }
-                },
-                // other chart options as needed
-            }
-        },
-        "candidate_questions": [
-            "Question 1?",
-            "Question 2?",
-            "Question 3?"
+    async def _request_completion(self, system_message: str, user_prompt: str, tier: ModelTier,
+                                  max_tokens: Optional[int] = None,
+                                  follow_up: Optional[List[Dict]] = None) -> Tuple[str, Dict, Optional[str]]:
+        """
+        Send a single chat completion request to a model tier.
+        Returns the raw content, its token usage and the finish reason ("length" when cut off at max_tokens).
+        """
+        max_tokens = max_tokens or tier.max_tokens
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_prompt}
         ]
-    }
-
-8. Ensure all JSON keys and values use double quotes, not single quotes.
-9. For color values, use standard CSS color names, hex codes, or rgba() format.
-10. Include proper axis formatting with titles and scales appropriate to the data.
-11. Set sensible defaults for colors, labels, and other visual elements.
-12. For time-series data, use the appropriate time scale configuration.
-"""
-
-            user_prompt = self._create_prompt(context)
-            
+        # Follow-up turns come after the unchanged prompt so its cached prefix is reused
+        messages.extend(follow_up or [])
+        
+        options = {"response_format": {"type": "json_object"}} if tier.json_mode else {}  # Force JSON output
+        
+        with tracer.span("llm.request", tier=tier.name, model=tier.model, max_tokens=max_tokens) as span:
+            span.set_attribute("payload.chars", sum(len(message["content"]) for message in messages))
+            start = time.perf_counter()
             try:
-                async with asyncio.timeout(60):  # Increase timeout to 60 seconds
-                    response = await self.client.chat.completions.create(
-                        model="gpt-4-turbo-preview",
-                        messages=[
-                            {"role": "system", "content": system_message},
-                            {"role": "user", "content": user_prompt}
-                        ],
+                async with asyncio.timeout(tier.timeout):
+                    response = await self._client_for(tier).chat.completions.create(
+                        model=tier.model,
+                        messages=messages,
                         temperature=0.3,  # Lower temperature for more precise output
-                        max_tokens=2000,
-                        response_format={"type": "json_object"}  # Force JSON output
+                        max_tokens=max_tokens,
+                        **options
                     )
             except asyncio.TimeoutError:
-                # Handle timeout specifically
-                return {
-                    "chart_config": None,
-                    "candidate_questions": ["Could you simplify your request? The previous one timed out."]
-                }
+                self.router.record(tier, (time.perf_counter() - start) * 1000, timed_out=True)
+                raise
+            self.router.record(tier, (time.perf_counter() - start) * 1000)
+            
+            usage = self._summarize_usage(response.usage)
+            for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+                span.set_attribute(f"usage.{key}", usage[key])
+            choice = response.choices[0]
+            span.set_attribute("finish_reason", choice.finish_reason)
+        print(f"Prompt cache: {usage['cached_tokens']}/{usage['prompt_tokens']} tokens cached ({usage['cached_ratio']:.0%})")
+        return choice.message.content, usage, choice.finish_reason
+
+    async def _generate_config(self, context: Dict) -> Dict:
+        """Generate chart configuration using AI"""
+        try:
+
+            with tracer.span("prompt.create") as span:
+                user_prompt = self._create_prompt(context)
+                span.set_attribute("payload.chars", len(user_prompt))
+            
+            routing = self.router.route(
+                context['command'], context['data'], is_update=context['current_config'] is not None
+            )
+            tier = routing["tier"]
+            print(f"Routing to {tier.name} tier ({tier.model}): {'; '.join(routing['reasons'])}")
+            
+            start = time.perf_counter()
+            while True:
+                try:
+                    content, usage, finish_reason = await self._request_completion(SYSTEM_MESSAGE, user_prompt, tier)
+                    break
+                except asyncio.TimeoutError:
+                    # A small tier that times out is retried once on the large tier
+                    routing["reasons"].append(f"{tier.name} tier timed out")
+                    tier = self.router.escalate(tier)
+                    if tier is None:
+                        return {
+                            "chart_config": None,
+                            "candidate_questions": ["Could you simplify your request? The previous one timed out."]
+                        }
+                    print(f"Request timed out, escalating to {tier.name} tier ({tier.model})")
             
-            content = response.choices[0].message.content
             print("Raw AI response:", content)
             
-            try:
-                # Try to parse as JSON
-                parsed_content = json.loads(content)
-                
-                # Check if it has the expected structure
-                if "chart_config" in parsed_content:
-                    return parsed_content
-                elif "candidate_questions" in parsed_content:
-                    return {
-                        "chart_config": None,
-                        "candidate_questions": parsed_content["candidate_questions"]
-                    }
-                else:
-                    # If it's valid JSON but missing expected keys, wrap it as chart_config
-                    return {
-                        "chart_config": parsed_content,
-                        "candidate_questions": []
-                    }
-            except json.JSONDecodeError:
-                # If JSON parsing fails, extract candidate questions from text
-                candidate_questions = self._extract_candidate_questions(content)
-                if candidate_questions:
-                    return {
-                        "chart_config": None,
-                        "candidate_questions": candidate_questions
-                    }
-                else:
-                    # If we can't extract questions, return a fallback error
-                    return {
-                        "chart_config": None,
-                        "candidate_questions": ["I couldn't understand the data. Could you try a simpler request?"]
-                    }
+            with tracer.span("response.parse") as span:
+                span.set_attribute("payload.chars", len(content or ""))
+                result, truncated = self._parse_response(content)
+            
+            # Ask only for a corrected config instead of discarding the whole response
+            errors = validate_chart_config(result["chart_config"]) if result.get("chart_config") else []
+            truncated = bool(result.get("chart_config")) and (truncated or finish_reason == "length")
+            if truncated:
+                # A config closed after a cut may validate while missing data points
+                errors.append("chart_config was cut off at the token limit, so values are missing; "
+                              "return it complete and as compact as possible")
+            if errors:
+                print(f"Invalid chart_config, requesting a fix: {errors}")
+                # Invalid output from the small tier is fixed by the large tier
+                fix_tier = self.router.escalate(tier) or tier
+                # A config that did not fit gets more room, otherwise the fix is cut off the same way
+                max_tokens = min(MAX_COMPLETION_TOKENS, 2 * fix_tier.max_tokens) if truncated else None
+                fixed_config, fix_usage = await self._fix_config(
+                    user_prompt, result["chart_config"], errors, fix_tier, max_tokens
+                )
+                usage = self._merge_usage([usage, fix_usage])
+                # An invalid or incomplete chart is never returned, as in deck mode
+                result["chart_config"] = fixed_config
+                if fixed_config is None and not result.get("candidate_questions"):
+                    result["candidate_questions"] = [
+                        "The chart was too large to generate completely. Could you ask for fewer series or data points?"
+                        if truncated else "I couldn't build a valid chart for this request. Could you rephrase it?"
+                    ]
+            
+            result["usage"] = usage
+            result["routing"] = {
+                "tier": tier.name,
+                "model": tier.model,
+                "reasons": routing["reasons"],
+                "latency_ms": round((time.perf_counter() - start) * 1000, 1)
+            }
+            return result
             
         except (ValueError, TypeError, json.JSONDecodeError) as e:
             print(f"Error in _generate_config: {str(e)}")
@@ -251,61 +458,299 @@ class ChartAgent:
                 ]
             }
     
-    def _create_prompt(self, context: Dict) -> str:
-        """Create a precise prompt for the AI"""
-        return f"""DATA STRUCTURE:
-{json.dumps(self._analyze_data_structure(context['data']), indent=2)}
+    async def _fix_config(self, user_prompt: str, chart_config: Any, errors: List[str],
+                          tier: ModelTier, max_tokens: Optional[int] = None) -> Tuple[Optional[Dict], Dict]:
+        """
+        Re-request a chart configuration that failed validation.
+        Returns the corrected config, or None if the fix is still invalid.
+        """
+        follow_up = [
+            {"role": "assistant", "content": json.dumps({"chart_config": chart_config}, separators=(",", ":"), default=str)},
+            {"role": "user", "content": "The chart_config above is invalid:\n- " + "\n- ".join(errors)
+                + '\nReturn only {"chart_config": {...}} with the complete, corrected configuration.'}
+        ]
+        try:
+            content, usage, finish_reason = await self._request_completion(
+                SYSTEM_MESSAGE, user_prompt, tier, max_tokens=max_tokens, follow_up=follow_up
+            )
+        except asyncio.TimeoutError:
+            return None, self._summarize_usage(None)
+        
+        try:
+            parsed_content, repair = parse_json(content)
+        except ValueError:
+            return None, usage
+        if finish_reason == "length" or repair == TRUNCATED:
+            return None, usage
+        
+        fixed_config = parsed_content.get("chart_config", parsed_content) if isinstance(parsed_content, dict) else None
+        if fixed_config is None or validate_chart_config(fixed_config):
+            return None, usage
+        return fixed_config, usage
+    
+    def _parse_response(self, content: str) -> Tuple[Dict, bool]:
+        """
+        Parse the raw AI response into chart_config and candidate_questions.
+        Also returns whether the response was truncated and had to be closed.
+        """
+        try:
+            # Try to parse as JSON, repairing truncation, comments and trailing commas
+            parsed_content, repair = parse_json(content)
+            if repair:
+                print(f"Repaired malformed JSON in AI response ({repair})")
+        except ValueError:
+            # If JSON parsing fails, extract candidate questions from text
+            candidate_questions = self._extract_candidate_questions(content or "")
+            if candidate_questions:
+                return {
+                    "chart_config": None,
+                    "candidate_questions": candidate_questions
+                }, False
+            else:
+                # If we can't extract questions, return a fallback error
+                return {
+                    "chart_config": None,
+                    "candidate_questions": ["I couldn't understand the data. Could you try a simpler request?"]
+                }, False
+        
+        # Check if it has the expected structure
+        truncated = repair == TRUNCATED
+        if not isinstance(parsed_content, dict):
+            return {
+                "chart_config": None,
+                "candidate_questions": ["I couldn't understand the data. Could you try a simpler request?"]
+            }, False
+        elif "chart_config" in parsed_content:
+            parsed_content.setdefault("candidate_questions", [])
+            return parsed_content, truncated
+        elif "candidate_questions" in parsed_content:
+            return {
+                "chart_config": None,
+                "candidate_questions": parsed_content["candidate_questions"]
+            }, truncated
+        else:
+            # If it's valid JSON but missing expected keys, wrap it as chart_config
+            return {
+                "chart_config": parsed_content,
+                "candidate_questions": []
+            }, truncated
+    
+    async def _generate_deck_batch(self, data_section: str, intents: List[str], retry: bool = True) -> Tuple[List[Dict], Dict]:
+        """Generate the slides for one batch of intents in a single AI call"""
+        user_prompt = self._create_deck_prompt(data_section, intents)
+        max_tokens = min(MAX_COMPLETION_TOKENS, DECK_TOKENS_PER_SLIDE * len(intents))
+        
+        usage = self._summarize_usage(None)
+        try:
+            content, usage, finish_reason = await self._request_completion(
+                SYSTEM_MESSAGE, user_prompt, self.router.deck_tier(), max_tokens=max_tokens
+            )
+            print("Raw AI deck response:", content)
+            # Truncated decks keep every slide that was completed
+            with tracer.span("response.parse") as span:
+                span.set_attribute("payload.chars", len(content or ""))
+                parsed_content, repair = parse_json(content)
+            slides = parsed_content.get("slides", []) if isinstance(parsed_content, dict) else []
+            if slides and (finish_reason == "length" or repair == TRUNCATED):
+                # The last slide was cut off and may miss data points, so it is re-requested
+                slides = slides[:-1]
+        except asyncio.TimeoutError:
+            slides = []
+            print("Deck batch timed out")
+        except (ValueError, TypeError) as e:
+            slides = []
+            print(f"Error in _generate_deck_batch: {str(e)}")
+        
+        # Align slides with the requested intents, keeping the original order
+        results = []
+        for intent, slide in zip(intents, self._match_slides(slides, intents)):
+            chart_config = slide.get("chart_config")
+            candidate_questions = slide.get("candidate_questions", [])
+            if chart_config and validate_chart_config(chart_config):
+                chart_config = None
+            if not chart_config and not candidate_questions:
+                candidate_questions = ["Could you rephrase this slide as a single chart request?"]
+            results.append({
+                "intent": intent,
+                "chart_config": chart_config,
+                "candidate_questions": candidate_questions
+            })
+        
+        # Re-request only the slides that are missing or invalid
+        missing = [index for index, slide in enumerate(results) if not slide["chart_config"]]
+        if retry and missing and slides:
+            retried, retry_usage = await self._generate_deck_batch(
+                data_section, [intents[index] for index in missing], retry=False
+            )
+            for index, slide in zip(missing, retried):
+                if slide["chart_config"]:
+                    results[index] = slide
+            usage = self._merge_usage([usage, retry_usage])
+        
+        return results, usage
+
+    @staticmethod
+    def _match_slides(slides: List[Any], intents: List[str]) -> List[Dict]:
+        """
+        Assign returned slides to intents by their echoed number or intent text.
+        Slides are taken by position only when none of them can be matched.
+        """
+        slides = [slide for slide in slides if isinstance(slide, dict)]
+        matched = [None] * len(intents)
+        for slide in slides:
+            number = slide.get("index")
+            candidates = []
+            if isinstance(number, int) and not isinstance(number, bool) and 1 <= number <= len(intents):
+                candidates = [number - 1]
+            elif isinstance(slide.get("intent"), str):
+                text = slide["intent"].strip().lower()
+                candidates = [position for position, intent in enumerate(intents) if intent.lower() == text]
+            position = next((position for position in candidates if matched[position] is None), None)
+            if position is not None:
+                matched[position] = slide
+        
+        if all(slide is None for slide in matched):
+            matched = slides[:len(intents)] + [None] * (len(intents) - len(slides))
+        return [slide or {} for slide in matched]
+
+    @staticmethod
+    def _summarize_usage(usage: Any) -> Dict:
+        """Extract prompt, completion and cached token counts from an API usage object"""
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        
+        # Cached tokens are only reported by backends that support prompt caching
+        details = getattr(usage, "prompt_tokens_details", None)
+        if isinstance(details, dict):
+            cached_tokens = details.get("cached_tokens", 0) or 0
+        else:
+            cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+            "cached_ratio": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0.0
+        }
+
+    @staticmethod
+    def _merge_usage(usages: List[Dict]) -> Dict:
+        """Combine the token usage of several requests"""
+        prompt_tokens = sum(usage["prompt_tokens"] for usage in usages)
+        cached_tokens = sum(usage["cached_tokens"] for usage in usages)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": sum(usage["completion_tokens"] for usage in usages),
+            "cached_tokens": cached_tokens,
+            "cached_ratio": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0.0
+        }
+
+    @staticmethod
+    def _serialize(value: Any) -> str:
+        """
+        Serialize prompt content deterministically so identical inputs produce identical prefixes.
+        NumPy and pandas values from the analysis are serialized natively.
+        """
+        return dumps(value, indent=True, sort_keys=True).decode('utf-8')
+
+    def _create_data_section(self, data: Any) -> str:
+        """Create the dataset layers of the prompt, shared by single charts and decks"""
+        # The section of the current dataset is rendered once and reused across commands
+        if data is self.current_data and self.current_data_section is not None:
+            return self.current_data_section
+        
+        rows = len(data) if isinstance(data, list) or hasattr(data, 'dtypes') else 0
+        if rows > MAX_PROMPT_ROWS and self.current_index is None:
+            with tracer.span("data.index"):
+                self.current_index = AggregateIndex.build(data)
+        
+        # The analysis of the current dataset is computed once and reused across commands
+        if self.current_analysis is None:
+            with tracer.span("data.analyze"):
+                self.current_analysis = self._analyze_data_structure(data, self.current_index)
+        
+        if rows <= MAX_PROMPT_ROWS or self.current_index is None:
+            section = f"""DATA STRUCTURE:
+{self._serialize(self.current_analysis)}
 
 ORIGINAL DATA:
-{json.dumps(context['data'], indent=2)}
+{self._serialize(self._records(data))}
+"""
+        else:
+            # Grouped values come from the precomputed cubes. Rows are replaced by a sample when the
+            # cube at the data's grain reproduces them, or when there are too many to send
+            grain = self.current_index.grain()
+            aggregates = self.current_index.summary(max_groups=PROMPT_MAX_GROUPS, keep=(grain,) if grain else ())
+            grain_note = f"; {' x '.join(grain)} has one row per group" if grain else ""
+            if grain is None and rows <= MAX_FULL_PROMPT_ROWS:
+                rows_layer = f"ORIGINAL DATA:\n{self._serialize(self._records(data))}"
+            else:
+                rows_layer = (f"SAMPLE DATA (first {PROMPT_SAMPLE_ROWS} of {rows} rows):\n"
+                              f"{self._serialize(self._records(data[:PROMPT_SAMPLE_ROWS]))}")
+            section = f"""DATA STRUCTURE:
+{self._serialize(self.current_analysis)}
 
-COMMAND: {context['command']}
+AGGREGATES (sum/count/mean/min/max per group over all {rows} rows{grain_note}):
+{self._serialize(aggregates)}
 
-PREVIOUS CONFIG: {json.dumps(context['current_config'], indent=2) if context['current_config'] else 'null'}
-
-REQUIREMENTS:
-1. Generate a complete Chart.js configuration
-2. Include all necessary data transformations
-3. Follow this exact structure:
-{{
-    "type": "<chart_type>",
-    "data": {{
-        "labels": [],
-        "datasets": [
-            {{
-                "label": "<dataset_label>",
-                "data": [],
-                ... other dataset options
-            }}
-        ]
-    }},
-    "options": {{
-        ... required chart options
-    }}
-}}
-
-4. For time-based data:
-   - Handle date formatting
-   - Support aggregations (daily→weekly→monthly→quarterly)
-   - Calculate growth rates when requested
-   - Include moving averages if needed
-
-5. For numerical data:
-   - Calculate proper scales
-   - Handle aggregations
-   - Support multiple axes if needed
-   - Format numbers appropriately
-
-6. For categorical data:
-   - Group data correctly
-   - Calculate proportions if needed
-   - Sort data when appropriate
-   - Handle multiple categories
+{rows_layer}
+"""
+        
+        if data is self.current_data:
+            self.current_data_section = section
+        return section
+
+    @staticmethod
+    def _records(data: Any) -> Any:
+        """Rows of a DataFrame as a list of records; other data is returned unchanged"""
+        return data.to_dict('records') if hasattr(data, 'to_dict') else data
+
+    def _create_prompt(self, context: Dict) -> str:
+        """
+        Create a precise prompt for the AI.
+        Layers are ordered from most to least stable (dataset, history, previous config, command)
+        so that repeated requests on the same dataset share a cacheable prefix.
+        """
+        previous_config, history = self._create_conversation_layers(context['current_config'])
+        return f"""{self._create_data_section(context['data'])}
+CONVERSATION HISTORY:
+{history}
+
+PREVIOUS CONFIG:
+{previous_config}
+
+COMMAND: {context['command']}
 
 Generate the Chart.js configuration now, and if the prompt is unclear, provide 3-5 candidate questions for clarification:"""
 
-    def _analyze_data_structure(self, data: Any) -> Dict:
-        """Analyze data structure with enhanced detail"""
+    def _create_conversation_layers(self, current_config: Optional[Dict]) -> Tuple[str, str]:
+        """
+        Render the previous config and the history so that together they stay within the memory's token cap
+        """
+        if not current_config:
+            return 'null', self.memory.render()
+        
+        previous_config = self._serialize(current_config)
+        if self.memory.estimate_tokens(previous_config) > self.memory.max_tokens:
+            # Long data arrays are shown by size; the model recomputes them from the dataset
+            previous_config = self._serialize(self.memory.compact_config(current_config))
+            previous_config += "\n(Arrays shown as <N values> were omitted; recompute them from the data.)"
+        history = self.memory.render(reserved_tokens=self.memory.estimate_tokens(previous_config))
+        return previous_config, history
+
+    def _create_deck_prompt(self, data_section: str, intents: List[str]) -> str:
+        """Create a prompt asking for one chart per slide intent"""
+        numbered_intents = "\n".join(f"{i + 1}. {intent}" for i, intent in enumerate(intents))
+        return f"""{data_section}
+SLIDE INTENTS:
+{numbered_intents}
+
+Generate exactly {len(intents)} slides now, in the same order as the intents:"""
+
+    def _analyze_data_structure(self, data: Any, index: Optional[AggregateIndex] = None) -> Dict:
+        """Analyze data structure with enhanced detail, reading numeric statistics from the index if given"""
+        import pandas as pd
+        
         # If data is already a dict (from previous conversion), convert it back to DataFrame
         if isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict):
             try:
@@ -331,19 +776,26 @@ Generate the Chart.js configuration now, and if the prompt is unclear, provide 3
                     
                     # Safe statistics calculation
                     stats = {
-                        "unique_count": int(data[col].nunique()),
-                        "missing_count": int(data[col].isna().sum()),
+                        "unique_count": data[col].nunique(),
+                        "missing_count": data[col].isna().sum(),
                         "sample_values": data[col].dropna().head(3).tolist()
                     }
                     
                     # Add numerical statistics if applicable
-                    if dtype in ['int64', 'float64']:
+                    totals = index.totals.get(col) if index is not None else None
+                    if totals and totals["count"]:
+                        stats.update({
+                            "min": totals["min"],
+                            "max": totals["max"],
+                            "mean": totals["mean"]
+                        })
+                    elif dtype in ['int64', 'float64']:
                         numeric_data = data[col].dropna()
                         if not numeric_data.empty:
                             stats.update({
-                                "min": float(numeric_data.min()),
-                                "max": float(numeric_data.max()),
-                                "mean": float(numeric_data.mean())
+                                "min": numeric_data.min(),
+                                "max": numeric_data.max(),
+                                "mean": numeric_data.mean()
                             })
                     
                     analysis["columns"][col] = {
@@ -368,11 +820,15 @@ Generate the Chart.js configuration now, and if the prompt is unclear, provide 3
 
                     # Categorize columns with more detail
                     if dtype in ['int64', 'float64']:
-                        numeric_data = data[col].dropna()
-                        if not numeric_data.empty:
+                        if totals and totals["count"]:
+                            value_range = [totals["min"], totals["max"]]
+                        else:
+                            numeric_data = data[col].dropna()
+                            value_range = None if numeric_data.empty else [numeric_data.min(), numeric_data.max()]
+                        if value_range is not None:
                             analysis["numerical_columns"].append({
                                 "name": col,
-                                "range": [float(numeric_data.min()), float(numeric_data.max())],
+                                "range": value_range,
                                 "distribution": "continuous"
                             })
                     else:
@@ -392,7 +848,7 @@ Generate the Chart.js configuration now, and if the prompt is unclear, provide 3
                         analysis["relationships"] = [
                             {
                                 "columns": [col1, col2],
-                                "correlation": float(corr_matrix.loc[col1, col2])
+                                "correlation": corr_matrix.loc[col1, col2]
                             }
                             for col1 in corr_matrix.columns
                             for col2 in corr_matrix.columns
@@ -0,0 +1,85 @@
+from typing import Any, Dict, Optional
+from src.utils.file_handler import FileHandler
+from src.utils.session_store import SessionStore
+
+
+class ChartSession:
+    """Chart agent whose state is persisted so it survives across CLI invocations"""
+
+    def __init__(self, store: Optional[SessionStore] = None):
+        self.store = store or SessionStore()
+        self.file_handler = FileHandler()
+        self._chart_agent = None
+        self.fingerprint = None
+        self.source_path = None
+        self.revision = None
+
+    @property
+    def chart_agent(self):
+        """Chart agent, created on first use"""
+        if self._chart_agent is None:
+            from .chart_agent import ChartAgent
+            self._chart_agent = ChartAgent()
+        return self._chart_agent
+
+    def load_file(self, file_path: str) -> Any:
+        """
+        Load a dataset and its aggregate index through the local cache
+        """
+        data, self.fingerprint = self.store.load_dataset(file_path, self.file_handler)
+        self.source_path = file_path
+        self.chart_agent.set_data(data, index=self.store.load_index(self.fingerprint, data))
+        return data
+
+    async def process_command(self, data: Any, command: str) -> Dict:
+        """
+        Generate a chart for a loaded dataset and persist the session
+        """
+        response = await self.chart_agent.process_command(data, command)
+        if response.get("chart_config"):
+            self.save()
+        return response
+
+    async def update_chart(self, command: str) -> Dict:
+        """
+        Update the chart of the saved session and persist the result
+        """
+        self.restore()
+        response = await self.chart_agent.update_chart(command)
+        if response.get("chart_config"):
+            self.save()
+        return response
+
+    def save(self):
+        """
+        Persist the dataset fingerprint and conversation state
+        """
+        session = self.store.save_session({
+            "fingerprint": self.fingerprint,
+            "source_path": self.source_path,
+            "agent": self.chart_agent.export_state()
+        })
+        self.revision = session["revision"]
+
+    def restore(self):
+        """
+        Load the saved session, unless this process already holds its latest revision
+        """
+        session = self.store.load_session()
+        if session is None:
+            raise ValueError("No existing chart to update. Run process-file first.")
+        if session.get("revision") == self.revision and self.chart_agent.current_data is not None:
+            return
+
+        data = self.store.load_cached_dataset(session["fingerprint"])
+        if data is None and session.get("source_path"):
+            # Cache was cleared: reload the original file
+            data, _ = self.store.load_dataset(session["source_path"], self.file_handler)
+        if data is None:
+            raise ValueError("The dataset of the saved chart is no longer available. Run process-file again.")
+
+        index = self.store.load_index(session["fingerprint"], data)
+        self.chart_agent.restore_state(session["agent"], data, index)
+        self.fingerprint = session["fingerprint"]
+        self.source_path = session.get("source_path")
+        self.revision = session.get("revision")
@@ -0,0 +1,188 @@
+import json
+from collections import deque
+from typing import Any, Dict, Optional
+
+# Rough characters-per-token ratio used to keep the conversation within its budget
+CHARS_PER_TOKEN = 4
+# Lists longer than this are recorded by size only in config deltas
+MAX_INLINE_LIST = 8
+MAX_SUMMARY_LENGTH = 160
+
+
+class ConversationMemory:
+    def __init__(self, max_recent_turns: int = 3, max_summaries: int = 5, max_tokens: int = 1500):
+        self.max_recent_turns = max_recent_turns
+        self.max_summaries = max_summaries
+        self.max_tokens = max_tokens
+        self.recent_turns = deque()
+        self.summaries = deque(maxlen=max_summaries)
+        self.omitted_turns = 0
+        self.last_config = None
+
+    def reset(self):
+        """
+        Forget the whole conversation, e.g. when the topic changes
+        """
+        self.recent_turns.clear()
+        self.summaries.clear()
+        self.omitted_turns = 0
+        self.last_config = None
+
+    def to_dict(self) -> Dict:
+        """
+        Export the memory as JSON-serializable state
+        """
+        return {
+            "recent_turns": list(self.recent_turns),
+            "summaries": list(self.summaries),
+            "omitted_turns": self.omitted_turns,
+            "last_config": self.last_config
+        }
+
+    def restore(self, state: Dict):
+        """
+        Restore the memory from state exported by to_dict
+        """
+        self.reset()
+        self.recent_turns.extend(state.get("recent_turns", []))
+        self.summaries.extend(state.get("summaries", []))
+        self.omitted_turns = state.get("omitted_turns", 0)
+        self.last_config = state.get("last_config")
+
+    def add_turn(self, command: str, chart_config: Optional[Dict]):
+        """
+        Record a turn, storing only the changes it made to the chart configuration
+        """
+        if not chart_config:
+            delta = {}
+        elif self.last_config is None:
+            # The full config is sent as PREVIOUS CONFIG, so the first turn only records its creation
+            chart_type = chart_config.get('type', 'unknown') if isinstance(chart_config, dict) else 'unknown'
+            delta = {"created": f"{chart_type} chart"}
+        else:
+            delta = self.config_delta(self.last_config, chart_config)
+        self.recent_turns.append({"command": command, "delta": delta})
+        if chart_config:
+            self.last_config = chart_config
+
+        # Compact the oldest turns into one-line summaries
+        while len(self.recent_turns) > self.max_recent_turns:
+            self._compact_oldest_turn()
+
+    def render(self, reserved_tokens: int = 0) -> str:
+        """
+        Render the history for the prompt, trimmed to the token budget
+        left after reserved_tokens (e.g. the previous config sent with it)
+        """
+        budget = max(self.max_tokens - reserved_tokens, 0)
+        while True:
+            lines = []
+            if self.omitted_turns:
+                lines.append(f"({self.omitted_turns} earlier turns omitted)")
+            if self.summaries:
+                lines.append("Earlier turns:")
+                lines.extend(f"- {summary}" for summary in self.summaries)
+            if self.recent_turns:
+                lines.append("Recent turns:")
+                for index, turn in enumerate(self.recent_turns, start=1):
+                    lines.append(f"{index}. Command: {turn['command']}")
+                    delta = json.dumps(turn["delta"], sort_keys=True, ensure_ascii=False, default=str)
+                    lines.append(f"   Config changes: {delta}")
+
+            rendered = "\n".join(lines) if lines else "none"
+            if not lines or self.estimate_tokens(rendered) <= budget:
+                return rendered
+
+            # Over budget: compact recent turns first, then drop the oldest summaries
+            if len(self.recent_turns) > 1:
+                self._compact_oldest_turn()
+            elif self.summaries:
+                self.summaries.popleft()
+                self.omitted_turns += 1
+            elif budget:
+                return rendered[:budget * CHARS_PER_TOKEN - 1]
+            else:
+                return "none"
+
+    def _compact_oldest_turn(self):
+        """Replace the oldest recent turn by a short summary"""
+        turn = self.recent_turns.popleft()
+        if len(self.summaries) == self.summaries.maxlen:
+            self.omitted_turns += 1
+        self.summaries.append(self.summarize_turn(turn))
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Estimate the token count of a text without a tokenizer"""
+        return len(text) // CHARS_PER_TOKEN + 1
+
+    @staticmethod
+    def summarize_turn(turn: Dict) -> str:
+        """Summarize a turn as its command and the configuration paths it changed"""
+        delta = turn["delta"]
+        changed = list(delta.get("set", {}).keys()) + list(delta.get("removed", []))
+        summary = f"\"{turn['command']}\""
+        if "created" in delta:
+            summary += f" created a {delta['created']}"
+        elif changed:
+            summary += f" changed {', '.join(changed)}"
+        else:
+            summary += " produced no chart changes"
+        if len(summary) > MAX_SUMMARY_LENGTH:
+            summary = summary[:MAX_SUMMARY_LENGTH - 3] + "..."
+        return summary
+
+    @classmethod
+    def config_delta(cls, old_config: Optional[Dict], new_config: Dict) -> Dict:
+        """
+        Compute the changes between two chart configurations as flattened paths
+        """
+        old_flat = cls._flatten(old_config or {})
+        new_flat = cls._flatten(new_config)
+
+        delta = {}
+        changed = {
+            path: cls._compact_value(value)
+            for path, value in new_flat.items()
+            if path not in old_flat or old_flat[path] != value
+        }
+        removed = [path for path in old_flat if path not in new_flat]
+        if changed:
+            delta["set"] = changed
+        if removed:
+            delta["removed"] = removed
+        return delta
+
+    @classmethod
+    def compact_config(cls, value: Any) -> Any:
+        """
+        Copy a configuration with long lists recorded by size, for configs too large to send whole
+        """
+        if isinstance(value, dict):
+            return {key: cls.compact_config(item) for key, item in value.items()}
+        if isinstance(value, list):
+            if not all(isinstance(item, dict) for item in value):
+                value = cls._compact_value(value)
+            return [cls.compact_config(item) for item in value] if isinstance(value, list) else value
+        return value
+
+    @classmethod
+    def _flatten(cls, value: Any, prefix: str = "") -> Dict[str, Any]:
+        """Flatten nested dicts into dotted paths; lists of dicts are indexed"""
+        flat = {}
+        if isinstance(value, dict):
+            for key, item in value.items():
+                flat.update(cls._flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        elif isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            for index, item in enumerate(value):
+                flat.update(cls._flatten(item, f"{prefix}.{index}"))
+        else:
+            flat[prefix] = value
+        return flat
+
+    @staticmethod
+    def _compact_value(value: Any) -> Any:
+        """Record long lists by size so deltas stay small"""
+        if isinstance(value, list) and len(value) > MAX_INLINE_LIST:
+            return f"<{len(value)} values>"
+        return value
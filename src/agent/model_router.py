@@ -0,0 +1,192 @@
+import json
+import os
+import re
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+# Data operations that need a stronger model to get right
+OPERATION_PATTERNS = {
+    'aggregate': r'\b(?:group(?:ed)? by|aggregat\w*|sum|totals?|average|mean|median|count)\b',
+    'derive': r'\b(?:percent(?:age)?s?|share|ratio|growth|change rate|differences?|delta|per)\b',
+    'window': r'\b(?:cumulative|running|moving|rolling|trend(?:line)?)\b',
+    'rank': r'\b(?:top|bottom|rank(?:ed|ing)?|sort(?:ed)?|highest|lowest)\b',
+    'filter': r'\b(?:filter(?:ed)?|only|exclude|excluding|where|between)\b',
+    'compare': r'\b(?:compar\w*|versus|vs|against|correlat\w*)\b',
+    'statistics': r'\b(?:forecast|predict\w*|regression|normali[sz]e\w*|outliers?|distribution|histogram)\b',
+    'combine': r'\b(?:secondary axis|dual axis|combined?|overlay|multiple)\b'
+}
+
+DEFAULT_TIERS = {
+    'small': {'model': 'gpt-3.5-turbo-0125', 'max_tokens': 1500, 'timeout': 30},
+    'large': {'model': 'gpt-4-turbo-preview', 'max_tokens': 2000, 'timeout': 60}
+}
+
+# Requests above any of these limits go to the large tier
+DEFAULT_THRESHOLDS = {
+    'max_small_words': 20,
+    'max_small_operations': 1,
+    'max_small_rows': 200,
+    'max_small_columns': 10
+}
+
+MAX_LATENCY_SAMPLES = 200
+
+
+class ModelTier:
+    """A model endpoint with its own completion limit and timeout"""
+
+    def __init__(self, name: str, model: str, max_tokens: int = 2000, timeout: float = 60,
+                 base_url: Optional[str] = None, api_key_env: Optional[str] = None, json_mode: bool = True):
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        # OpenAI-compatible endpoints (vLLM, Ollama, LM Studio...) are reached through base_url
+        self.base_url = base_url
+        self.api_key_env = api_key_env
+        self.json_mode = json_mode
+
+
+class ModelRouter:
+    """
+    Route chart requests to a model tier from local signals: command length,
+    detected data operations, dataset size and whether the request edits an existing chart.
+    Simple requests go to the small tier; anything else, and all decks, to the large tier.
+    """
+
+    def __init__(self, tiers: Optional[Dict[str, Dict]] = None, thresholds: Optional[Dict[str, int]] = None,
+                 small_tier: str = 'small', large_tier: str = 'large'):
+        tiers = tiers or DEFAULT_TIERS
+        self.tiers = {name: ModelTier(name, **settings) for name, settings in tiers.items()}
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+
+        # With a single configured tier every request goes there
+        self.large_tier = large_tier if large_tier in self.tiers else next(iter(self.tiers))
+        self.small_tier = small_tier if small_tier in self.tiers else self.large_tier
+
+        self._operation_patterns = {name: re.compile(pattern) for name, pattern in OPERATION_PATTERNS.items()}
+        self.decisions = Counter()
+        self.latencies = {name: deque(maxlen=MAX_LATENCY_SAMPLES) for name in self.tiers}
+        self.timeouts = Counter()
+
+    @classmethod
+    def from_env(cls) -> 'ModelRouter':
+        """
+        Load tiers and thresholds from the JSON file named by CHATSLIDE_MODEL_CONFIG, if set
+        """
+        config_path = os.getenv('CHATSLIDE_MODEL_CONFIG')
+        if not config_path:
+            return cls()
+
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        return cls(
+            tiers=config.get('tiers'),
+            thresholds=config.get('thresholds'),
+            small_tier=config.get('small_tier', 'small'),
+            large_tier=config.get('large_tier', 'large')
+        )
+
+    def detect_operations(self, command: str) -> List[str]:
+        """
+        Return the data operations a command asks for
+        """
+        text = command.lower()
+        return [name for name, pattern in self._operation_patterns.items() if pattern.search(text)]
+
+    def route(self, command: str, data: Any = None, is_update: bool = False) -> Dict:
+        """
+        Choose a tier for a chart request and return it with the reasons for the decision
+        """
+        rows, columns = self._data_size(data)
+        operations = self.detect_operations(command)
+        words = len(command.split())
+
+        reasons = []
+        if words > self.thresholds['max_small_words']:
+            reasons.append(f"long command ({words} words)")
+        if len(operations) > self.thresholds['max_small_operations']:
+            reasons.append(f"multiple operations ({', '.join(operations)})")
+        elif operations and not is_update:
+            reasons.append(f"new chart with {operations[0]} operation")
+        # Edits keep the data of the existing chart, so only new charts are routed by row count
+        if rows > self.thresholds['max_small_rows'] and not is_update:
+            reasons.append(f"large dataset ({rows} rows)")
+        if columns > self.thresholds['max_small_columns']:
+            reasons.append(f"wide dataset ({columns} columns)")
+
+        tier = self.tiers[self.large_tier if reasons else self.small_tier]
+        self.decisions[tier.name] += 1
+        return {
+            "tier": tier,
+            "reasons": reasons or ["simple " + ("edit" if is_update else "chart")],
+            "operations": operations
+        }
+
+    def deck_tier(self) -> ModelTier:
+        """
+        Decks generate several charts per call and always use the large tier
+        """
+        self.decisions[self.large_tier] += 1
+        return self.tiers[self.large_tier]
+
+    def escalate(self, tier: ModelTier) -> Optional[ModelTier]:
+        """
+        Return the tier to retry on after a timeout, or None if already on the large tier
+        """
+        return None if tier.name == self.large_tier else self.tiers[self.large_tier]
+
+    def max_latency(self) -> float:
+        """
+        Longest time one chart request can take in seconds: a small tier that times out
+        is retried on the large tier, and an invalid config is then fixed by the large tier
+        """
+        small, large = self.tiers[self.small_tier], self.tiers[self.large_tier]
+        path = [large, large] if small is large else [small, large, large]
+        return sum(tier.timeout for tier in path)
+
+    def record(self, tier: ModelTier, latency_ms: float, timed_out: bool = False):
+        """
+        Record the latency of one request on a tier
+        """
+        if timed_out:
+            self.timeouts[tier.name] += 1
+        else:
+            self.latencies[tier.name].append(latency_ms)
+
+    def stats(self) -> Dict:
+        """
+        Routing decisions and recent latency percentiles per tier
+        """
+        stats = {}
+        for name, tier in self.tiers.items():
+            samples = sorted(self.latencies[name])
+            stats[name] = {
+                "model": tier.model,
+                "base_url": tier.base_url,
+                "routed": self.decisions[name],
+                "timeouts": self.timeouts[name],
+                "p50_ms": round(self._percentile(samples, 0.5), 1) if samples else None,
+                "p95_ms": round(self._percentile(samples, 0.95), 1) if samples else None,
+                "mean_ms": round(sum(samples) / len(samples), 1) if samples else None
+            }
+        return stats
+
+    @staticmethod
+    def _percentile(samples: List[float], fraction: float) -> float:
+        """Nearest-rank percentile of sorted samples"""
+        index = min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))
+        return samples[index]
+
+    @staticmethod
+    def _data_size(data: Any) -> tuple:
+        """Rows and columns of a DataFrame, list of records or dict of columns"""
+        if hasattr(data, 'shape'):
+            return data.shape[0], data.shape[1] if len(data.shape) > 1 else 1
+        if isinstance(data, list):
+            columns = len(data[0]) if data and isinstance(data[0], dict) else 1
+            return len(data), columns
+        if isinstance(data, dict):
+            lengths = [len(value) for value in data.values() if isinstance(value, (list, dict))]
+            return max(lengths, default=1), len(data)
+        return 0, 0
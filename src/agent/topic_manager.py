@@ -1,18 +1,188 @@
+import math
+import re
+from collections import Counter, deque
+from typing import Dict, Iterable, List, Optional, Set
+
+# Phrases that explicitly start a new topic
+TOPIC_CHANGE_PHRASES = {
+    'new project', 'different data', 'start over', 'new chart', 'from scratch',
+    'something else', 'forget that', 'fresh chart', 'new topic'
+}
+
+# Phrases that refer back to the current chart, so the command likely refines it
+REFINEMENT_PHRASES = {
+    'it', 'this', 'that', 'these', 'those', 'them', 'instead', 'also', 'too',
+    'add', 'remove', 'change', 'make', 'keep', 'same', 'current chart', 'the chart'
+}
+
+# Words that carry no topic information: grammar, chart types, styling and transformation vocabulary
+STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'in', 'on', 'to', 'for', 'by', 'with', 'as', 'at',
+    'from', 'per', 'vs', 'versus', 'over', 'into', 'is', 'are', 'be', 'please', 'me', 'my',
+    'show', 'plot', 'display', 'draw', 'create', 'give', 'want', 'can', 'you', 'let', 'see',
+    'chart', 'graph', 'visualize', 'visualization', 'data',
+    'bar', 'line', 'pie', 'doughnut', 'radar', 'polar', 'area', 'bubble', 'scatter', 'stacked',
+    'color', 'colors', 'colour', 'title', 'legend', 'axis', 'label', 'labels', 'secondary',
+    'use', 'using', 'total', 'totals', 'sum', 'average', 'mean', 'count', 'moving', 'rolling',
+    'cumulative', 'day', 'daily', 'week', 'weekly', 'month', 'monthly', 'quarter', 'quarterly',
+    'year', 'yearly', 'annual'
+}
+
+# Commands whose similarity to the current topic falls below this are treated as new topics
+SIMILARITY_THRESHOLD = 0.1
+# New content words a command with a refinement phrase may bring and still refine the chart
+# (e.g. "add units sold"); a whole new subject ("make a chart of customer churn per plan") has more
+REFINEMENT_NEW_WORDS = 2
+# Demonstratives in time expressions ("this year") do not refer back to the chart
+TIME_EXPRESSIONS = re.compile(r"\b(?:this|that|these|those)\s+(?:days?|weeks?|months?|quarters?|years?)\b")
+MAX_CORPUS_SIZE = 20
+
+
 class TopicManager:
-    def __init__(self):
+    def __init__(self, topic_phrases: Optional[Iterable[str]] = None,
+                 refinement_phrases: Optional[Iterable[str]] = None,
+                 similarity_threshold: float = SIMILARITY_THRESHOLD,
+                 refinement_new_words: int = REFINEMENT_NEW_WORDS):
         self.current_topic = None
-        self.topic_keywords = set(['new project', 'different data', 'start over'])
-    
+        self.topic_keywords = set(topic_phrases or TOPIC_CHANGE_PHRASES)
+        self.refinement_keywords = set(refinement_phrases or REFINEMENT_PHRASES)
+        self.similarity_threshold = similarity_threshold
+        self.refinement_new_words = refinement_new_words
+        self.corpus = deque(maxlen=MAX_CORPUS_SIZE)
+        self._topic_pattern = self._compile(self.topic_keywords)
+        self._refinement_pattern = self._compile(self.refinement_keywords)
+
+    @staticmethod
+    def _compile(phrases: Iterable[str]) -> re.Pattern:
+        """
+        Compile phrases into a single word-bounded alternation, longest first
+        """
+        alternatives = sorted((re.escape(phrase.lower()) for phrase in phrases), key=len, reverse=True)
+        return re.compile(r"\b(?:" + "|".join(alternatives) + r")\b")
+
+    def add_topic_phrases(self, phrases: Iterable[str]):
+        """
+        Register additional phrases that explicitly start a new topic
+        """
+        self.topic_keywords.update(phrases)
+        self._topic_pattern = self._compile(self.topic_keywords)
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """
+        Split text into lowercase content words, including column names like Units_Sold
+        """
+        words = re.findall(r"[a-z0-9]+", re.sub(r"([a-z])([A-Z])", r"\1 \2", text).lower())
+        return [word for word in words if word not in STOPWORDS and len(word) > 1]
+
+    def set_topic(self, command: str, chart_config: Optional[Dict] = None):
+        """
+        Describe the current topic by the command and the chart's title, axes and datasets
+        """
+        parts = [command]
+        if isinstance(chart_config, dict):
+            options = chart_config.get('options') or {}
+            title = ((options.get('plugins') or {}).get('title') or {}).get('text')
+            if isinstance(title, str):
+                parts.append(title)
+            for scale in (options.get('scales') or {}).values():
+                scale_title = ((scale or {}).get('title') or {}).get('text') if isinstance(scale, dict) else None
+                if isinstance(scale_title, str):
+                    parts.append(scale_title)
+            for dataset in (chart_config.get('data') or {}).get('datasets') or []:
+                if isinstance(dataset, dict) and isinstance(dataset.get('label'), str):
+                    parts.append(dataset['label'])
+
+        self.current_topic = Counter(self.tokenize(" ".join(parts)))
+        self.corpus.append(set(self.current_topic))
+
+    def reset(self):
+        """
+        Forget the current topic
+        """
+        self.current_topic = None
+        self.corpus.clear()
+
+    def to_dict(self) -> Dict:
+        """
+        Export the current topic as JSON-serializable state
+        """
+        return {
+            "current_topic": dict(self.current_topic) if self.current_topic else None,
+            "corpus": [sorted(document) for document in self.corpus]
+        }
+
+    def restore(self, state: Dict):
+        """
+        Restore the current topic from state exported by to_dict
+        """
+        topic = state.get("current_topic")
+        self.current_topic = Counter(topic) if topic else None
+        self.corpus.clear()
+        self.corpus.extend(set(document) for document in state.get("corpus", []))
+
+    def similarity(self, command: str) -> float:
+        """
+        TF-IDF cosine similarity between a command and the current topic
+        """
+        return self._similarity(Counter(self.tokenize(command)))
+
+    def _similarity(self, terms: Counter) -> float:
+        """Cosine similarity of term counts, weighted by IDF over the session's documents"""
+        if not self.current_topic or not terms:
+            return 0.0
+
+        documents = list(self.corpus) + [set(terms)]
+        total = len(documents)
+
+        def weight(term: str, count: int) -> float:
+            frequency = sum(1 for document in documents if term in document)
+            return count * (math.log((1 + total) / (1 + frequency)) + 1)
+
+        command_vector = {term: weight(term, count) for term, count in terms.items()}
+        topic_vector = {term: weight(term, count) for term, count in self.current_topic.items()}
+
+        dot = sum(value * topic_vector.get(term, 0.0) for term, value in command_vector.items())
+        norm = math.sqrt(sum(v * v for v in command_vector.values())) * math.sqrt(sum(v * v for v in topic_vector.values()))
+        return dot / norm if norm else 0.0
+
     def is_new_topic(self, command: str) -> bool:
         """
         Detect if the command indicates a new topic
         """
         command_lower = command.lower()
-        
+
         # Check for explicit topic change indicators
-        for keyword in self.topic_keywords:
-            if keyword in command_lower:
-                return True
-        
-        # Add more sophisticated topic detection logic here
-        return False 
\ No newline at end of file
+        if self._topic_pattern.search(command_lower):
+            return True
+
+        # Without a current chart there is nothing to switch away from
+        if not self.current_topic:
+            return False
+
+        terms = Counter(self.tokenize(command))
+        # Referring back to the chart is a bias, not a veto: it allows a few new words of its own
+        refers_back = bool(self._refinement_pattern.search(TIME_EXPRESSIONS.sub(" ", command_lower)))
+        allowed_new_words = self.refinement_new_words if refers_back else 0
+        is_new = (
+            # Commands with no content words (e.g. "as a pie chart") are style changes
+            bool(terms)
+            and self._similarity(terms) < self.similarity_threshold
+            and len(self._new_words(terms)) > allowed_new_words
+        )
+        if terms:
+            self.corpus.append(set(terms))
+        return is_new
+
+    def _new_words(self, terms: Counter) -> Set[str]:
+        """Content words of a command that are neither refinement phrases nor part of the current topic"""
+        topic = {self._singular(term) for term in self.current_topic}
+        return {
+            term for term in terms
+            if term not in self.refinement_keywords and self._singular(term) not in topic
+        }
+
+    @staticmethod
+    def _singular(word: str) -> str:
+        """Drop a plural s so "products" matches a "product" topic"""
+        return word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
@@ -1,37 +1,60 @@
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi import Request
 import aiofiles
-from src.agent.chart_agent import ChartAgent
+from src.api.responses import FastJSONResponse
+from src.utils.aggregate_index import AggregateIndex
 from src.utils.file_handler import FileHandler
+from src.utils.tracing import tracer
+
+try:
+    # Optional: brotli-asgi serves br to clients that accept it and gzip to the rest
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MINIMUM_SIZE = 1024
 
 class AppState:
     """Class to manage the application state, including current file data."""
     
     def __init__(self):
         self.current_file_data = None
+        self.current_index = None
 
 class ChartAPI:
     """Class to handle chart-related API operations."""
     
     def __init__(self):
         self.state = AppState()
-        self.chart_agent = ChartAgent()
+        self._chart_agent = None
         self.file_handler = FileHandler()
 
+    @property
+    def chart_agent(self):
+        """Chart agent, created on the first chart request so the server starts without loading it"""
+        if self._chart_agent is None:
+            from src.agent.chart_agent import ChartAgent
+            self._chart_agent = ChartAgent()
+        return self._chart_agent
+
     async def save_upload_file(self, file: UploadFile) -> str:
         """Save uploaded file and return the file path"""
         os.makedirs("uploads", exist_ok=True)
         file_path = f"uploads/{file.filename}"
         
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        with tracer.span("upload.save", filename=file.filename) as span:
+            async with aiofiles.open(file_path, 'wb') as f:
+                content = await file.read()
+                await f.write(content)
+            span.set_attribute("payload.bytes", len(content))
         
         return file_path
 
@@ -46,13 +69,16 @@ class ChartAPI:
             print("Processing file upload...")
             file_path = await self.save_upload_file(file)
             self.state.current_file_data = self.file_handler.load_file(file_path)
+            with tracer.span("data.index"):
+                self.state.current_index = AggregateIndex.build(self.state.current_file_data)
             print(self.state.current_file_data)
             preview = self.get_data_preview(self.state.current_file_data)
             print(preview)
             return {
                 "status": "success",
                 "filename": file.filename,
-                "preview": preview
+                "preview": preview,
+                "aggregates": list(self.state.current_index.dimensions) if self.state.current_index else []
             }
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e)) from e
@@ -62,17 +88,60 @@ class ChartAPI:
         try:
             if self.state.current_file_data is None:
                 raise HTTPException(status_code=400, detail="No file uploaded")
+            self.chart_agent.set_data(self.state.current_file_data, index=self.state.current_index)
             response = await self.chart_agent.process_command(self.state.current_file_data, command)
             chart_config = response.get("chart_config")
             candidate_questions = response.get("candidate_questions", [])  # Default to empty list
-            output_path = self.file_handler.save_chart(chart_config)
+            
+            # The browser renders the config itself, so only the config is saved
+            output_path = ""
+            if chart_config:
+                output_path = self.file_handler.save_chart(chart_config, html=False)
             return {
                 "status": "success",
-                "chart_path": "/output/chart.html",
                 "config": chart_config,
                 "candidate_questions": candidate_questions,
-                "output_path": output_path
+                "output_path": output_path,
+                "usage": response.get("usage"),
+                "routing": response.get("routing")
+            }
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+
+    async def process_deck_command(self, intents: List[str]) -> Dict:
+        """Handle deck generation command"""
+        try:
+            if self.state.current_file_data is None:
+                raise HTTPException(status_code=400, detail="No file uploaded")
+            self.chart_agent.set_data(self.state.current_file_data, index=self.state.current_index)
+            response = await self.chart_agent.generate_deck(self.state.current_file_data, intents)
+            
+            slides = []
+            for index, slide in enumerate(response.get("slides", []), start=1):
+                chart_config = slide.get("chart_config")
+                
+                # Only save slides that produced a valid config
+                output_path = ""
+                chart_path = ""
+                if chart_config:
+                    output_path = self.file_handler.save_chart(chart_config, name=f"deck_{index}")
+                    chart_path = f"/output/deck_{index}.html"
+                
+                slides.append({
+                    "intent": slide.get("intent"),
+                    "chart_path": chart_path,
+                    "config": chart_config,
+                    "candidate_questions": slide.get("candidate_questions", []),
+                    "output_path": output_path
+                })
+            
+            return {
+                "status": "success",
+                "slides": slides,
+                "usage": response.get("usage")
             }
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e)) from e
 
@@ -86,21 +155,26 @@ class ChartAPI:
             if isinstance(response, dict) and "chart_config" in response:
                 updated_config = response.get("chart_config")
                 candidate_questions = response.get("candidate_questions", [])
+                usage = response.get("usage")
+                routing = response.get("routing")
             else:
                 updated_config = response
                 candidate_questions = []
+                usage = None
+                routing = None
             
             # Only save chart if we have a valid config
             output_path = ""
             if updated_config:
-                output_path = self.file_handler.save_chart(updated_config)
+                output_path = self.file_handler.save_chart(updated_config, html=False)
             
             return {
                 "status": "success",
-                "chart_path": "/output/chart.html",
                 "config": updated_config,
                 "candidate_questions": candidate_questions,
-                "output_path": output_path
+                "output_path": output_path,
+                "usage": usage,
+                "routing": routing
             }
         except (ValueError, TypeError, KeyError) as e:  # Specify relevant exceptions
             print(f"Error in update_existing_chart: {str(e)}")
@@ -128,7 +202,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Requests under these paths are never traced
+UNTRACED_PREFIXES = ("/static", "/output", "/debug")
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Record a trace per API request when tracing is enabled"""
+    if not tracer.enabled or request.url.path.startswith(UNTRACED_PREFIXES):
+        return await call_next(request)
+    with tracer.trace(f"{request.method} {request.url.path}") as span:
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+        return response
+
+# Compress large payloads such as data previews and chart configs
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
+
 # Mount static files and templates
+os.makedirs("output", exist_ok=True)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.mount("/output", StaticFiles(directory="output"), name="output")
 templates = Jinja2Templates(directory="templates")
@@ -138,17 +232,34 @@ async def home(request: Request):
     """Render home page"""
     return templates.TemplateResponse("index.html", {"request": request})
 
-@app.post("/upload")
+@app.post("/upload", response_class=FastJSONResponse)
 async def upload_file(file: UploadFile = File(...)):
     """Handle file upload endpoint"""
-    return await api.process_file_upload(file)
+    return FastJSONResponse(await api.process_file_upload(file))
 
-@app.post("/process")
+@app.post("/process", response_class=FastJSONResponse)
 async def process_command(command: str = Form(...)):
     """Handle chart generation endpoint"""
-    return await api.process_chart_command(command)
+    return FastJSONResponse(await api.process_chart_command(command))
+
+@app.post("/deck", response_class=FastJSONResponse)
+async def generate_deck(intents: List[str] = Form(...)):
+    """Handle deck generation endpoint, one chart per slide intent"""
+    return FastJSONResponse(await api.process_deck_command(intents))
 
-@app.post("/update")
+@app.post("/update", response_class=FastJSONResponse)
 async def update_chart(command: str = Form(...)):
     """Handle chart update endpoint"""
-    return await api.update_existing_chart(command) 
\ No newline at end of file
+    return FastJSONResponse(await api.update_existing_chart(command))
+
+@app.get("/debug/routing", response_class=FastJSONResponse)
+async def debug_routing():
+    """Return model routing decisions and per-tier latency"""
+    return FastJSONResponse(api.chart_agent.router.stats())
+
+@app.get("/debug/traces", response_class=FastJSONResponse)
+async def debug_traces():
+    """Return the most recent request traces; only available with CHATSLIDE_TRACING=1"""
+    if not tracer.enabled:
+        raise HTTPException(status_code=404, detail="Tracing is disabled")
+    return FastJSONResponse({"traces": tracer.recent_traces()})
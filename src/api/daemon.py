@@ -0,0 +1,144 @@
+import json
+import os
+import secrets
+import socket
+from typing import Dict, Optional
+from src.agent.chart_session import ChartSession
+from src.agent.model_router import ModelRouter
+from src.utils.session_store import SessionStore
+from src.utils.tracing import tracer
+
+# Seconds allowed on top of the model requests for loading the dataset and saving the chart
+DAEMON_OVERHEAD = 30
+
+
+class ChartDaemon:
+    """Long-lived local server that keeps the chart agent and datasets warm between CLI calls"""
+
+    def __init__(self, store: Optional[SessionStore] = None, host: str = '127.0.0.1', port: int = 0):
+        self.store = store or SessionStore()
+        self.session = ChartSession(self.store)
+        self.host = host
+        self.port = port
+        self.token = secrets.token_hex(16)
+        self._server = None
+
+    async def handle_request(self, request: Dict) -> Dict:
+        """
+        Run a CLI action in this process and return the result
+        """
+        action = request.get("action")
+        try:
+            if action == "process_file":
+                data = self.session.load_file(request["file_path"])
+                response = await self.session.process_command(data, request["command"])
+            elif action == "update_chart":
+                response = await self.session.update_chart(request["command"])
+            elif action == "shutdown":
+                self._server.close()
+                return {"status": "success"}
+            else:
+                return {"status": "error", "detail": f"Unknown action: {action}"}
+        except Exception as e:
+            # Any failure is answered, otherwise the CLI would wait for a reply that never comes
+            return {"status": "error", "detail": str(e) or type(e).__name__}
+
+        chart_config = response.get("chart_config")
+        if not chart_config:
+            return {
+                "status": "error",
+                "detail": "No chart configuration generated",
+                "candidate_questions": response.get("candidate_questions", [])
+            }
+
+        return {
+            "status": "success",
+            "config": chart_config,
+            "candidate_questions": response.get("candidate_questions", []),
+            # Charts are written to the daemon's working directory, so the CLI needs the full path
+            "output_path": os.path.abspath(self.session.file_handler.save_chart(chart_config))
+        }
+
+    async def _handle_connection(self, reader, writer):
+        """Read one JSON request line and answer with one JSON response line"""
+        try:
+            request = json.loads(await reader.readline())
+            if request.get("token") != self.token:
+                response = {"status": "error", "detail": "Invalid daemon token"}
+            else:
+                with tracer.trace(f"daemon.{request.get('action')}"):
+                    response = await self.handle_request(request)
+        except json.JSONDecodeError:
+            response = {"status": "error", "detail": "Invalid request"}
+
+        writer.write(json.dumps(response, default=str).encode() + b"\n")
+        await writer.drain()
+        writer.close()
+
+    async def serve(self):
+        """
+        Serve until a shutdown request, advertising the port and token in the state directory
+        """
+        import asyncio
+
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+        # Only the current user may read the token
+        self.store.state_dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.store.daemon_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({"host": self.host, "port": self.port, "pid": os.getpid(), "token": self.token}, f)
+
+        try:
+            async with self._server:
+                try:
+                    await self._server.serve_forever()
+                except asyncio.CancelledError:
+                    pass
+        finally:
+            self.store.daemon_path.unlink(missing_ok=True)
+
+
+class DaemonClient:
+    """Forwards CLI actions to a running daemon, if there is one"""
+
+    def __init__(self, store: Optional[SessionStore] = None, timeout: Optional[float] = None):
+        self.store = store or SessionStore()
+        # Wait for the slowest escalation path of the configured tiers, plus loading and saving
+        self.timeout = timeout or ModelRouter.from_env().max_latency() + DAEMON_OVERHEAD
+
+    def request(self, action: str, **params) -> Optional[Dict]:
+        """
+        Send an action to the daemon. Returns None when no daemon is running; once the
+        daemon has accepted the request, failures are returned as errors so the action
+        is not run a second time locally.
+        """
+        if not self.store.daemon_path.exists():
+            return None
+        try:
+            with open(self.store.daemon_path, 'r') as f:
+                info = json.load(f)
+            connection = socket.create_connection((info["host"], info["port"]), timeout=self.timeout)
+        except (ConnectionRefusedError, FileNotFoundError, ValueError, KeyError):
+            # Stale daemon file from a daemon that is no longer running
+            return None
+        except OSError as e:
+            return {"status": "error", "detail": f"Could not reach the daemon: {e}"}
+
+        try:
+            with connection:
+                payload = dict(params, action=action, token=info["token"])
+                connection.sendall(json.dumps(payload).encode() + b"\n")
+                response = connection.makefile('rb').readline()
+        except socket.timeout:
+            return {"status": "error", "detail": f"The daemon did not answer within {self.timeout:.0f} seconds"}
+        except OSError as e:
+            return {"status": "error", "detail": f"Lost the connection to the daemon: {e}"}
+
+        if not response:
+            return {"status": "error", "detail": "The daemon closed the connection without answering"}
+        try:
+            return json.loads(response)
+        except ValueError:
+            return {"status": "error", "detail": "The daemon sent an invalid response"}
@@ -0,0 +1,13 @@
+from typing import Any
+from fastapi.responses import JSONResponse
+from src.utils.serialization import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response serialized with orjson, accepting NumPy and pandas values directly.
+    Return it from endpoints instead of a dict to skip FastAPI's jsonable_encoder pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
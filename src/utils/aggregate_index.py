@@ -0,0 +1,250 @@
+import warnings
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Tuple
+
+AGGREGATIONS = ['sum', 'count', 'mean', 'min', 'max']
+
+# Text columns with at most this many distinct values are indexed as group-by dimensions
+MAX_CATEGORIES = 50
+# Rollups and cubes with more groups than this are not stored
+MAX_GROUPS = 500
+# Share of values that must parse as dates for a text column to be treated as temporal
+MIN_DATE_RATIO = 0.9
+DATE_SAMPLE_SIZE = 200
+
+# Temporal rollups from finest to coarsest: pandas period frequency and the label of a period start
+TEMPORAL_ROLLUPS = {
+    'day': ('D', lambda start: start.strftime('%Y-%m-%d')),
+    'week': ('W', lambda start: start.strftime('%Y-%m-%d')),
+    'month': ('M', lambda start: start.strftime('%Y-%m')),
+    'quarter': ('Q', lambda start: f"{start.year}Q{start.quarter}")
+}
+
+
+class AggregateIndex:
+    """
+    Group-by cubes over a dataset, built once when it is loaded.
+    Dimensions are low-cardinality categorical columns and day/week/month/quarter rollups
+    of temporal columns; every cube holds sum/count/mean/min/max of each numeric column,
+    for single dimensions and for pairs of dimensions, so grouped values are read in O(groups).
+    """
+
+    def __init__(self, rows: int, measures: List[str], dimensions: Dict[str, Dict],
+                 cubes: Dict[Tuple[str, ...], Dict], totals: Dict[str, Dict],
+                 columns: Optional[List[str]] = None):
+        self.rows = rows
+        self.measures = measures
+        self.dimensions = dimensions
+        self.cubes = cubes
+        self.totals = totals
+        # Non-numeric columns of the dataset, indexed or not; unknown for indexes saved without them
+        self.columns = columns
+
+    @classmethod
+    def build(cls, data: Any) -> Optional['AggregateIndex']:
+        """
+        Index a DataFrame or list of records; returns None for data without a tabular shape
+        or without any column to group by
+        """
+        import pandas as pd
+
+        if isinstance(data, list) and data and isinstance(data[0], dict):
+            data = pd.DataFrame(data)
+        if not hasattr(data, 'dtypes') or data.empty:
+            return None
+
+        measures = [
+            col for col in data.columns
+            if pd.api.types.is_numeric_dtype(data[col]) and not pd.api.types.is_bool_dtype(data[col])
+        ]
+
+        # Group keys of every dimension, with the formatter for its labels
+        keys = {}
+        dimensions = {}
+        for col in data.columns:
+            if col in measures:
+                continue
+            dates = cls._parse_dates(data[col])
+            if dates is not None:
+                for rollup, starts, groups in cls._rollups(dates):
+                    name = f"{col}:{rollup}"
+                    keys[name] = (starts, TEMPORAL_ROLLUPS[rollup][1])
+                    dimensions[name] = {"column": col, "rollup": rollup, "groups": groups}
+                continue
+            groups = data[col].nunique()
+            if 1 < groups <= MAX_CATEGORIES:
+                keys[col] = (data[col], None)
+                dimensions[col] = {"column": col, "rollup": None, "groups": groups}
+        if not dimensions:
+            return None
+
+        cubes = {}
+        for name in dimensions:
+            cubes[(name,)] = cls._build_cube(data, measures, [keys[name]])
+        for first, second in combinations(dimensions, 2):
+            if dimensions[first]["column"] == dimensions[second]["column"]:
+                continue
+            if dimensions[first]["groups"] * dimensions[second]["groups"] > MAX_GROUPS:
+                continue
+            cubes[(first, second)] = cls._build_cube(data, measures, [keys[first], keys[second]])
+
+        # Aggregated per column so integer columns keep integer sums and extremes
+        totals = {measure: {agg: data[measure].agg(agg) for agg in AGGREGATIONS} for measure in measures}
+
+        columns = [col for col in data.columns if col not in measures]
+        return cls(len(data), measures, dimensions, cubes, totals, columns)
+
+    @staticmethod
+    def _parse_dates(column: Any) -> Any:
+        """Return the column as datetimes if it holds dates, otherwise None"""
+        import pandas as pd
+
+        if pd.api.types.is_datetime64_any_dtype(column):
+            return column
+        if column.dtype != object:
+            return None
+
+        sample = column.dropna().head(DATE_SAMPLE_SIZE)
+        if sample.empty or not sample.map(lambda value: isinstance(value, str)).all():
+            return None
+        with warnings.catch_warnings():
+            # Format inference warnings for ambiguous strings
+            warnings.simplefilter('ignore')
+            if pd.to_datetime(sample, errors='coerce').notna().mean() < MIN_DATE_RATIO:
+                return None
+            dates = pd.to_datetime(column, errors='coerce')
+        return dates if dates.notna().mean() >= MIN_DATE_RATIO else None
+
+    @staticmethod
+    def _rollups(dates: Any) -> List[Tuple[str, Any, int]]:
+        """
+        Period start keys of each rollup level that adds information: a level is skipped when it
+        has too many groups, or as many as the next coarser level (e.g. days of monthly data)
+        """
+        levels = []
+        for rollup, (freq, _) in TEMPORAL_ROLLUPS.items():
+            # Period starts are plain datetimes, which group much faster than Period objects
+            starts = dates.dt.to_period(freq).dt.start_time
+            levels.append((rollup, starts, starts.nunique()))
+
+        kept = []
+        for index, (rollup, starts, groups) in enumerate(levels):
+            coarser_groups = levels[index + 1][2] if index + 1 < len(levels) else 0
+            if 1 < groups <= MAX_GROUPS and groups != coarser_groups:
+                kept.append((rollup, starts, groups))
+        return kept
+
+    @staticmethod
+    def _build_cube(data: Any, measures: List[str], keys: List[Tuple[Any, Any]]) -> Dict:
+        """Aggregate every measure over the given group keys in one pass"""
+        frame = data[measures].copy()
+        group_columns = []
+        for position, (values, _) in enumerate(keys):
+            column = f"__group_{position}"
+            frame[column] = values.values
+            group_columns.append(column)
+
+        grouped = frame.groupby(group_columns, sort=True, observed=True)
+        stats = grouped[measures].agg(AGGREGATIONS) if measures else None
+        sizes = grouped.size()
+
+        labels = []
+        for key in sizes.index:
+            key = key if isinstance(key, tuple) else (key,)
+            label = [formatter(value) if formatter else value for value, (_, formatter) in zip(key, keys)]
+            labels.append(label if len(label) > 1 else label[0])
+
+        return {
+            "keys": labels,
+            "rows": sizes.tolist(),
+            "measures": {
+                measure: {agg: stats[(measure, agg)].tolist() for agg in AGGREGATIONS}
+                for measure in measures
+            }
+        }
+
+    def query(self, by: Any, measure: Optional[str] = None, agg: str = 'sum') -> Dict:
+        """
+        Return {group: value} for a measure aggregated by one or two dimensions,
+        or the row count per group when no measure is given
+        """
+        by = (by,) if isinstance(by, str) else tuple(by)
+        # Pair cubes are stored once; the reversed order reads the same cube
+        reverse = by not in self.cubes and by[::-1] in self.cubes
+        cube = self.cubes.get(by[::-1] if reverse else by)
+        if cube is None:
+            raise KeyError(f"No aggregate cube for {', '.join(by)}")
+
+        values = cube["rows"] if measure is None else cube["measures"][measure][agg]
+        keys = [tuple(key[::-1] if reverse else key) if isinstance(key, list) else key for key in cube["keys"]]
+        return dict(zip(keys, values))
+
+    def grain(self) -> Optional[Tuple[str, ...]]:
+        """
+        The cube holding one row per group over every non-numeric column, which reproduces
+        the dataset exactly (e.g. Date:day of daily data), or None if the rows are finer
+        than every cube or have columns that are not indexed
+        """
+        if self.columns is None:
+            return None
+        for by, cube in sorted(self.cubes.items(), key=lambda item: len(item[0])):
+            if {self.dimensions[name]["column"] for name in by} != set(self.columns):
+                continue
+            if len(cube["rows"]) == self.rows and all(count == 1 for count in cube["rows"]):
+                return by
+        return None
+
+    def summary(self, max_groups: int = MAX_GROUPS, keep: Tuple[Tuple[str, ...], ...] = ()) -> List[Dict]:
+        """
+        Cubes with at most max_groups groups, and the cubes in keep whatever their size,
+        in a compact columnar form for prompts. Cubes of single-row groups list only
+        the row values, where every aggregation would repeat them.
+        """
+        summary = []
+        for by, cube in self.cubes.items():
+            if len(cube["keys"]) > max_groups and by not in keep:
+                continue
+            if all(count == 1 for count in cube["rows"]):
+                # The mean of one row is its value, and stays missing for missing values
+                measures = {
+                    measure: {"value": [self._round(value) for value in stats["mean"]]}
+                    for measure, stats in cube["measures"].items()
+                }
+                summary.append({"by": list(by), "keys": cube["keys"], "measures": measures})
+                continue
+            measures = {
+                measure: {agg: [self._round(value) for value in values] for agg, values in stats.items()}
+                for measure, stats in cube["measures"].items()
+            }
+            summary.append({"by": list(by), "keys": cube["keys"], "rows": cube["rows"], "measures": measures})
+        return summary
+
+    @staticmethod
+    def _round(value: Any) -> Any:
+        """Round floats to keep prompts short"""
+        return round(value, 2) if isinstance(value, float) else value
+
+    def to_dict(self) -> Dict:
+        """
+        Export the index as JSON-serializable data
+        """
+        return {
+            "rows": self.rows,
+            "measures": self.measures,
+            "dimensions": self.dimensions,
+            "cubes": [dict(cube, by=list(by)) for by, cube in self.cubes.items()],
+            "totals": self.totals,
+            "columns": self.columns
+        }
+
+    @classmethod
+    def from_dict(cls, value: Dict) -> 'AggregateIndex':
+        """
+        Restore an index exported by to_dict
+        """
+        cubes = {}
+        for cube in value.get("cubes", []):
+            cube = dict(cube)
+            cubes[tuple(cube.pop("by"))] = cube
+        return cls(value["rows"], value["measures"], value["dimensions"], cubes, value.get("totals", {}),
+                   value.get("columns"))
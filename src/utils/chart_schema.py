@@ -0,0 +1,101 @@
+from typing import Any, Callable, Dict, List
+
+CHART_TYPES = ["bar", "line", "pie", "doughnut", "radar", "polarArea", "bubble", "scatter"]
+
+# Subset of the Chart.js configuration that must be present for the chart to render
+CHART_CONFIG_SCHEMA = {
+    "type": "object",
+    "required": ["type", "data"],
+    "properties": {
+        "type": {"type": "string", "enum": CHART_TYPES},
+        "data": {
+            "type": "object",
+            "required": ["datasets"],
+            "properties": {
+                "labels": {"type": "array"},
+                "datasets": {
+                    "type": "array",
+                    "minItems": 1,
+                    "items": {
+                        "type": "object",
+                        "required": ["data"],
+                        "properties": {
+                            "label": {"type": "string"},
+                            "type": {"type": "string", "enum": CHART_TYPES},
+                            "data": {"type": "array"}
+                        }
+                    }
+                }
+            }
+        },
+        "options": {"type": "object"}
+    }
+}
+
+JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str
+}
+
+Validator = Callable[[Any, str], List[str]]
+
+
+def compile_schema(schema: Dict) -> Validator:
+    """
+    Compile a schema into a validator function returning a list of errors
+    """
+    expected_type = JSON_TYPES.get(schema.get("type"))
+    enum = set(schema["enum"]) if "enum" in schema else None
+    required = schema.get("required", [])
+    min_items = schema.get("minItems", 0)
+    properties = {name: compile_schema(sub_schema) for name, sub_schema in schema.get("properties", {}).items()}
+    items = compile_schema(schema["items"]) if "items" in schema else None
+
+    def validate(value: Any, path: str = "chart_config") -> List[str]:
+        if expected_type is not None and not isinstance(value, expected_type):
+            return [f"{path} must be of type {schema['type']}"]
+        if enum is not None and value not in enum:
+            return [f"{path} must be one of {', '.join(sorted(enum))}"]
+
+        errors = []
+        if isinstance(value, dict):
+            errors.extend(f"{path}.{name} is missing" for name in required if name not in value)
+            for name, validate_property in properties.items():
+                if name in value:
+                    errors.extend(validate_property(value[name], f"{path}.{name}"))
+        elif isinstance(value, list):
+            if len(value) < min_items:
+                errors.append(f"{path} must contain at least {min_items} item(s)")
+            if items is not None:
+                for index, item in enumerate(value):
+                    errors.extend(items(item, f"{path}[{index}]"))
+        return errors
+
+    return validate
+
+
+# Compiled once at import so each response is validated without re-reading the schema
+_validate_schema = compile_schema(CHART_CONFIG_SCHEMA)
+
+
+def validate_chart_config(value: Any, path: str = "chart_config") -> List[str]:
+    """
+    Validate a chart configuration against the schema, then check that every
+    dataset has one value per label (a truncated series renders silently otherwise)
+    """
+    errors = _validate_schema(value, path)
+    if errors:
+        return errors
+
+    labels = value["data"].get("labels")
+    if not isinstance(labels, list) or not labels:
+        return errors
+    for index, dataset in enumerate(value["data"]["datasets"]):
+        data = dataset["data"]
+        # Points given as {x, y} objects are positioned by their own keys
+        if any(isinstance(point, dict) for point in data):
+            continue
+        if len(data) != len(labels):
+            errors.append(f"{path}.data.datasets[{index}].data has {len(data)} values for {len(labels)} labels")
+    return errors
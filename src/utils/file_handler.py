@@ -1,8 +1,8 @@
-import pandas as pd
 import json
 from pathlib import Path
 from typing import Any, Union
 import shutil
+from src.utils.tracing import tracer
 
 class FileHandler:
     def __init__(self):
@@ -21,7 +21,22 @@ class FileHandler:
         if path.suffix not in self.supported_extensions:
             raise ValueError(f"Unsupported file type: {path.suffix}")
             
+        with tracer.span("data.load", format=path.suffix) as span:
+            span.set_attribute("payload.bytes", path.stat().st_size)
+            data = self._read_file(path)
+            if hasattr(data, 'shape'):
+                span.set_attribute("data.rows", data.shape[0])
+                span.set_attribute("data.columns", data.shape[1])
+            return data
+    
+    def _read_file(self, path: Path) -> Any:
+        """
+        Parse a file with a supported extension
+        """
         try:
+            # pandas is only needed once a file is actually loaded
+            import pandas as pd
+            
             if path.suffix == '.json':
                 with open(path, 'r') as f:
                     return json.load(f)
@@ -32,23 +47,29 @@ class FileHandler:
         except Exception as e:
             raise ValueError(f"Error loading file: {str(e)}")
     
-    def save_chart(self, chart_config: dict) -> str:
+    def save_chart(self, chart_config: dict, name: str = 'chart', html: bool = True) -> str:
         """
-        Save chart configuration and generate HTML
+        Save chart configuration and generate HTML.
+        With html=False only the configuration is written and its path returned.
         """
-        # Create output directory if it doesn't exist
-        self.output_dir.mkdir(exist_ok=True)
-        
-        # Save chart configuration
-        config_path = self.output_dir / 'chart_config.json'
-        with open(config_path, 'w') as f:
-            json.dump(chart_config, f, indent=2)
-        
-        # Generate HTML file
-        html_path = self.output_dir / 'chart.html'
-        self._generate_html(chart_config, html_path)
-        
-        return str(html_path)
+        with tracer.span("chart.save", chart=name, html=html) as span:
+            # Create output directory if it doesn't exist
+            self.output_dir.mkdir(exist_ok=True)
+            
+            # Save chart configuration
+            config_path = self.output_dir / f'{name}_config.json'
+            with open(config_path, 'w') as f:
+                json.dump(chart_config, f, indent=2)
+            span.set_attribute("payload.bytes", config_path.stat().st_size)
+            
+            if not html:
+                return str(config_path)
+            
+            # Generate HTML file
+            html_path = self.output_dir / f'{name}.html'
+            self._generate_html(chart_config, html_path)
+            
+            return str(html_path)
     
     def _generate_html(self, chart_config: dict, output_path: Path):
         """
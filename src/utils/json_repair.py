@@ -0,0 +1,138 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+CLOSERS = {'{': '}', '[': ']'}
+# Repair kinds reported by parse_json
+REPAIRED = "repaired"
+TRUNCATED = "truncated"
+# Cut points tried, from the end, when a truncated document cannot be closed as-is
+MAX_CUT_ATTEMPTS = 20
+
+
+def parse_json(text: str) -> Tuple[Any, Optional[str]]:
+    """
+    Parse JSON, repairing common model output defects if needed.
+    Returns the parsed value and None, REPAIRED, or TRUNCATED when the document
+    was cut off and had to be closed, so values may be missing.
+    """
+    try:
+        return json.loads(text), None
+    except (json.JSONDecodeError, TypeError):
+        pass
+
+    candidates, truncated = _repair(text or "")
+    for index, candidate in enumerate(candidates):
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        # Every candidate after the first drops content at a cut point
+        return value, TRUNCATED if truncated or index > 0 else REPAIRED
+
+    raise ValueError("Could not repair JSON content")
+
+
+def repair_candidates(text: str) -> List[str]:
+    """
+    Build repaired versions of a JSON document, most complete first.
+    Handles markdown fences and surrounding prose, // and /* */ comments,
+    "..." placeholders, trailing commas and truncated output.
+    """
+    return _repair(text)[0]
+
+
+def _repair(text: str) -> Tuple[List[str], bool]:
+    """Build the repair candidates and whether the top-level value was left open"""
+    start = min((i for i in (text.find('{'), text.find('[')) if i != -1), default=-1)
+    if start == -1:
+        return [], False
+
+    out = []
+    stack = []
+    cut_points = []
+    in_string = False
+    escaped = False
+    i = start
+    length = len(text)
+
+    while i < length:
+        char = text[i]
+
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            i += 1
+            continue
+
+        # Comments and placeholders outside strings
+        if text.startswith('//', i):
+            newline = text.find('\n', i)
+            i = length if newline == -1 else newline
+            continue
+        if text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = length if end == -1 else end + 2
+            continue
+        if text.startswith('...', i):
+            i += 3
+            continue
+
+        if char == '"':
+            in_string = True
+            out.append(char)
+        elif char in CLOSERS:
+            stack.append(char)
+            out.append(char)
+            cut_points.append((len(out), tuple(stack)))
+        elif char in '}]':
+            _strip_trailing_comma(out)
+            if stack and CLOSERS[stack[-1]] == char:
+                stack.pop()
+            out.append(char)
+            if not stack:
+                # Ignore anything after the top-level value
+                break
+        elif char == ',':
+            cut_points.append((len(out), tuple(stack)))
+            out.append(char)
+        else:
+            out.append(char)
+        i += 1
+
+    truncated = bool(stack)
+    candidates = []
+    body = "".join(out)
+    if in_string:
+        body += '"'
+    body = body.rstrip()
+    if body.endswith(','):
+        body = body[:-1]
+    candidates.append(body + _closers(stack))
+
+    # Truncated output: fall back to the last complete values
+    for position, cut_stack in reversed(cut_points[-MAX_CUT_ATTEMPTS:]):
+        prefix = "".join(out[:position]).rstrip()
+        if prefix.endswith(','):
+            prefix = prefix[:-1]
+        candidates.append(prefix + _closers(list(cut_stack)))
+
+    return candidates, truncated
+
+
+def _strip_trailing_comma(out: List[str]):
+    """Remove a comma directly before a closing bracket"""
+    index = len(out) - 1
+    while index >= 0 and out[index].isspace():
+        index -= 1
+    if index >= 0 and out[index] == ',':
+        del out[index]
+
+
+def _closers(stack: List[str]) -> str:
+    """Return the brackets needed to close every open container"""
+    return "".join(CLOSERS[opener] for opener in reversed(stack))
@@ -0,0 +1,30 @@
+from typing import Any
+
+import orjson
+
+
+def _default(value: Any) -> Any:
+    """Convert NumPy and pandas values that JSON does not support natively"""
+    if hasattr(value, 'isoformat'):
+        # datetime, pandas Timestamp; pandas NaT becomes null
+        text = value.isoformat()
+        return None if text == 'NaT' else text
+    if hasattr(value, 'tolist'):
+        # NumPy scalars and arrays, pandas Index and Series
+        return value.tolist()
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    return str(value)
+
+
+def dumps(value: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """
+    Serialize to UTF-8 JSON bytes with native NumPy/pandas support.
+    NaN and infinity are written as null and non-string keys as strings.
+    """
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(value, default=_default, option=option)
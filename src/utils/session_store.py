@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from src.utils.aggregate_index import AggregateIndex
+from src.utils.serialization import dumps
+
+DEFAULT_STATE_DIR = '.chatslide'
+
+
+class SessionStore:
+    def __init__(self, state_dir: Optional[str] = None):
+        self.state_dir = Path(state_dir or os.getenv('CHATSLIDE_STATE_DIR', DEFAULT_STATE_DIR))
+        self.dataset_dir = self.state_dir / 'datasets'
+        self.session_path = self.state_dir / 'session.json'
+        self.daemon_path = self.state_dir / 'daemon.json'
+        # Datasets already loaded by this process, used by the long-lived daemon
+        self.loaded_datasets = {}
+        self.loaded_indexes = {}
+
+    @staticmethod
+    def fingerprint(file_path: str) -> str:
+        """
+        Hash the file contents so an unchanged dataset maps to the same cache entry
+        """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()[:16]
+
+    def load_dataset(self, file_path: str, file_handler) -> Tuple[Any, str]:
+        """
+        Load a dataset from the local cache, parsing and caching the file on a miss
+        """
+        if not Path(file_path).exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+
+        fingerprint = self.fingerprint(file_path)
+        data = self.load_cached_dataset(fingerprint)
+        if data is None:
+            data = file_handler.load_file(file_path)
+            self._cache_dataset(fingerprint, data)
+        return data, fingerprint
+
+    def load_cached_dataset(self, fingerprint: str) -> Any:
+        """
+        Return a cached dataset, or None if it is not cached
+        """
+        if fingerprint in self.loaded_datasets:
+            return self.loaded_datasets[fingerprint]
+
+        pickle_path = self.dataset_dir / f'{fingerprint}.pkl'
+        json_path = self.dataset_dir / f'{fingerprint}.json'
+        data = None
+        if pickle_path.exists():
+            import pandas as pd
+            data = pd.read_pickle(pickle_path)
+        elif json_path.exists():
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+
+        if data is not None:
+            self.loaded_datasets[fingerprint] = data
+        return data
+
+    def load_index(self, fingerprint: str, data: Any) -> Optional[AggregateIndex]:
+        """
+        Return the aggregate index of a dataset, building and caching it next to the dataset on a miss
+        """
+        if fingerprint in self.loaded_indexes:
+            return self.loaded_indexes[fingerprint]
+
+        index_path = self.dataset_dir / f'{fingerprint}.index.json'
+        index = None
+        if index_path.exists():
+            with open(index_path, 'r') as f:
+                index = AggregateIndex.from_dict(json.load(f))
+        # Indexes saved without their column list are rebuilt so the prompt can check their grain
+        if index is None or index.columns is None:
+            index = AggregateIndex.build(data)
+            if index is not None:
+                self._write_json(index_path, index.to_dict())
+
+        self.loaded_indexes[fingerprint] = index
+        return index
+
+    def _cache_dataset(self, fingerprint: str, data: Any):
+        """Store a parsed dataset; DataFrames are pickled to keep their dtypes"""
+        self.loaded_datasets[fingerprint] = data
+        self.dataset_dir.mkdir(parents=True, exist_ok=True)
+        if hasattr(data, 'to_pickle'):
+            data.to_pickle(self.dataset_dir / f'{fingerprint}.pkl')
+        else:
+            self._write_json(self.dataset_dir / f'{fingerprint}.json', data)
+
+    def load_session(self) -> Optional[Dict]:
+        """
+        Return the saved session, or None if there is none
+        """
+        if not self.session_path.exists():
+            return None
+        with open(self.session_path, 'r') as f:
+            return json.load(f)
+
+    def save_session(self, session: Dict) -> Dict:
+        """
+        Save the session, incrementing its revision so stale copies can be detected
+        """
+        previous = self.load_session() or {}
+        session = dict(session, revision=previous.get('revision', 0) + 1)
+        self._write_json(self.session_path, session)
+        return session
+
+    def _write_json(self, path: Path, value: Any):
+        """Write JSON atomically so a concurrent reader never sees a partial file"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(dumps(value))
+        os.replace(temp_path, path)
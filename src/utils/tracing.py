@@ -0,0 +1,262 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SERVICE_NAME = 'chatslide'
+MAX_RECENT_TRACES = 50
+
+_current_trace = ContextVar('chatslide_trace', default=None)
+_current_span = ContextVar('chatslide_span', default=None)
+
+
+class Span:
+    """A timed pipeline stage with attributes such as payload sizes"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, attributes: Optional[Dict] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes
+        }
+
+    def to_otlp(self) -> Dict:
+        """Span in the OTLP/JSON encoding"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()]
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled so instrumented code needs no checks"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_value(value: Any) -> Dict:
+    """Encode an attribute value as an OTLP AnyValue"""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp_request(spans: List[Span]) -> Dict:
+    """Wrap spans in an OTLP ExportTraceServiceRequest"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": "chatslide.tracing"},
+                "spans": [span.to_otlp() for span in spans]
+            }]
+        }]
+    }
+
+
+class FileSpanExporter:
+    """Appends one OTLP/JSON request per trace to a JSON Lines file, for offline use"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(to_otlp_request(spans), default=str)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line + "\n")
+
+
+class OTLPHttpSpanExporter:
+    """Sends traces to an OpenTelemetry collector's OTLP/HTTP JSON endpoint in the background"""
+
+    def __init__(self, endpoint: str, timeout: float = 5):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]):
+        body = json.dumps(to_otlp_request(spans), default=str).encode('utf-8')
+        threading.Thread(target=self._send, args=(body,), daemon=True).start()
+
+    def _send(self, body: bytes):
+        import urllib.request
+
+        request = urllib.request.Request(self.endpoint, data=body, headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(request, timeout=self.timeout).close()
+        except OSError as e:
+            print(f"Warning: Failed to export trace: {str(e)}")
+
+
+class Tracer:
+    """
+    Opt-in request tracing. Each request (or CLI command) is a trace whose spans
+    time the pipeline stages; slow traces can additionally be profiled with cProfile.
+    Configured with CHATSLIDE_TRACING, CHATSLIDE_TRACE_DIR, CHATSLIDE_OTLP_ENDPOINT,
+    CHATSLIDE_PROFILE_THRESHOLD_MS and CHATSLIDE_PROFILE_SAMPLE_RATE.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, trace_dir: Optional[str] = None,
+                 otlp_endpoint: Optional[str] = None, profile_threshold_ms: Optional[float] = None,
+                 profile_sample_rate: Optional[float] = None):
+        if enabled is None:
+            enabled = os.getenv('CHATSLIDE_TRACING', '').lower() in ('1', 'true', 'yes')
+        self.enabled = enabled
+        self.trace_dir = Path(trace_dir or os.getenv('CHATSLIDE_TRACE_DIR', 'traces'))
+
+        threshold = profile_threshold_ms if profile_threshold_ms is not None else os.getenv('CHATSLIDE_PROFILE_THRESHOLD_MS')
+        self.profile_threshold_ms = float(threshold) if threshold not in (None, '') else None
+        rate = profile_sample_rate if profile_sample_rate is not None else os.getenv('CHATSLIDE_PROFILE_SAMPLE_RATE', '1')
+        self.profile_sample_rate = float(rate)
+
+        self.exporters = [FileSpanExporter(self.trace_dir / 'spans.jsonl')]
+        endpoint = otlp_endpoint or os.getenv('CHATSLIDE_OTLP_ENDPOINT')
+        if endpoint:
+            self.exporters.append(OTLPHttpSpanExporter(endpoint))
+
+        self.recent = deque(maxlen=MAX_RECENT_TRACES)
+        self._profiling = False
+
+    @contextmanager
+    def trace(self, name: str, **attributes):
+        """
+        Start a trace with a root span; exported when the block exits
+        """
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+
+        trace_id = os.urandom(16).hex()
+        root = Span(name, trace_id, attributes=attributes)
+        spans = [root]
+        trace_token = _current_trace.set(spans)
+        span_token = _current_span.set(root)
+        profiler = self._start_profiler()
+        try:
+            yield root
+        except Exception as e:
+            root.set_attribute("error", str(e))
+            raise
+        finally:
+            root.end_ns = time.time_ns()
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            if profiler is not None:
+                self._stop_profiler(profiler, root)
+            self._export(spans)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Time a stage inside the current trace; a no-op outside of a trace
+        """
+        spans = _current_trace.get()
+        if spans is None:
+            yield NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        span = Span(name, parent.trace_id, parent.span_id, attributes)
+        spans.append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.set_attribute("error", str(e))
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+
+    def recent_traces(self) -> List[Dict]:
+        """
+        Return the most recent traces, newest first
+        """
+        return list(reversed(self.recent))
+
+    def _export(self, spans: List[Span]):
+        """Keep the trace for the debug endpoint and send it to the exporters"""
+        root = spans[0]
+        self.recent.append({
+            "trace_id": root.trace_id,
+            "name": root.name,
+            "duration_ms": round(root.duration_ms, 3),
+            "spans": [span.to_dict() for span in spans]
+        })
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except OSError as e:
+                print(f"Warning: Failed to export trace: {str(e)}")
+
+    def _start_profiler(self):
+        """Profile this trace if profiling is on, sampled, and no other trace is being profiled"""
+        if self.profile_threshold_ms is None or self._profiling or random.random() >= self.profile_sample_rate:
+            return None
+
+        import cProfile
+
+        # One profiler at a time: concurrent requests on the event loop share it
+        self._profiling = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop_profiler(self, profiler, root: Span):
+        """Keep the profile only when the trace was slower than the threshold"""
+        profiler.disable()
+        self._profiling = False
+        if root.duration_ms < self.profile_threshold_ms:
+            return
+
+        profile_path = self.trace_dir / 'profiles' / f'{root.trace_id}.prof'
+        profile_path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(profile_path))
+        root.set_attribute("profile.path", str(profile_path))
+
+
+# Shared tracer, configured from the environment
+tracer = Tracer()
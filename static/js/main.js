@@ -216,9 +216,9 @@ async function sendCommand(command) {
         if (data.status === 'success') {
             showProgress(100);
             
-            // Only display chart if we have a valid chart_path
-            if (data.chart_path) {
-                displayChart(data.chart_path, data.output_path);
+            // Only display chart if we have a valid config
+            if (data.config) {
+                displayChart(data.config, data.output_path);
                 currentCommand = command;
             }
             
@@ -298,15 +298,31 @@ function displayDataPreview(preview) {
     previewElement.innerHTML = `<pre>${JSON.stringify(preview, null, 2)}</pre>`;
 }
 
-function displayChart(chartPath, outputPath) {
-    const chartFrame = document.getElementById('chartFrame');
+// Single Chart.js instance, updated in place after each command
+let chartInstance = null;
+
+function displayChart(config, outputPath) {
+    const canvas = document.getElementById('chartCanvas');
+    const start = performance.now();
     
-    // Log for debugging
-    console.log('Setting chart path:', chartPath);
+    // Fill the panel instead of keeping the default aspect ratio
+    const options = Object.assign({ responsive: true, maintainAspectRatio: false }, config.options || {});
     
-    // Make sure the path is absolute
-    const absolutePath = chartPath.startsWith('/') ? chartPath : '/' + chartPath;
-    chartFrame.src = absolutePath;
+    if (chartInstance && chartInstance.config.type === config.type) {
+        // Same chart type: swap data and options and let Chart.js animate the difference
+        chartInstance.data = config.data;
+        chartInstance.options = options;
+        chartInstance.update();
+    } else {
+        // A different chart type needs a new controller
+        if (chartInstance) {
+            chartInstance.destroy();
+        }
+        chartInstance = new Chart(canvas, Object.assign({}, config, { options }));
+    }
+    
+    // Log for debugging
+    console.log(`Chart rendered in ${(performance.now() - start).toFixed(1)} ms`);
     
     // Add output path display
     const chartContainer = document.querySelector('.chart-container');
@@ -319,9 +335,4 @@ function displayChart(chartPath, outputPath) {
     }
     
     pathDisplay.textContent = `Output Path: ${outputPath}`;
-    
-    // Log when the iframe loads
-    chartFrame.onload = () => {
-        console.log('Chart iframe loaded');
-    };
-} 
\ No newline at end of file
+}
@@ -0,0 +1,39 @@
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# ChartAgent requires a key at construction; tests never reach the API
+os.environ.setdefault('OPENAI_API_KEY', 'test-key')
+
+
+class FakeCompletions:
+    """
+    Returns the queued (content, finish_reason) replies, or those of a function
+    of the request, and records each request
+    """
+
+    def __init__(self, replies):
+        self.replies = replies if callable(replies) else list(replies)
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        content, finish_reason = self.replies(kwargs) if callable(self.replies) else self.replies.pop(0)
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10, prompt_tokens_details=None)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)], usage=usage)
+
+
+@pytest.fixture
+def fake_replies():
+    """Install a fake API client on an agent; returns the completions recording its requests"""
+    def install(agent, replies):
+        completions = FakeCompletions(replies)
+        agent._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        return completions
+    return install
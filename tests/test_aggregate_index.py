@@ -0,0 +1,121 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.agent.chart_agent import MAX_FULL_PROMPT_ROWS, MAX_PROMPT_ROWS, PROMPT_SAMPLE_ROWS, ChartAgent
+from src.utils.aggregate_index import AggregateIndex
+from src.utils.serialization import dumps
+
+
+def sales(rows=2000):
+    np.random.seed(0)
+    return pd.DataFrame({
+        'Date': pd.date_range('2023-01-01', periods=rows, freq='6h'),
+        'Region': np.random.choice(['North', 'South', 'East', 'West'], rows),
+        'Revenue': np.random.normal(500, 100, rows).round(2),
+        'Units': np.random.randint(1, 20, rows)
+    })
+
+
+def weather(days=365):
+    np.random.seed(1)
+    return pd.DataFrame({
+        'Date': pd.date_range('2023-01-01', periods=days, freq='D').strftime('%Y-%m-%d'),
+        'Temperature': np.random.normal(15, 5, days).round(1),
+        'Humidity': np.random.randint(30, 90, days)
+    })
+
+
+def test_query_matches_pandas_after_json_round_trip():
+    data = sales()
+    index = AggregateIndex.from_dict(json.loads(dumps(AggregateIndex.build(data).to_dict())))
+
+    by_region = index.query('Region', 'Revenue')
+    expected = data.groupby('Region')['Revenue'].sum()
+    assert by_region.keys() == set(expected.index)
+    assert all(abs(by_region[region] - value) < 1e-6 for region, value in expected.items())
+
+    by_month = index.query(('Region', 'Date:month'), 'Units', 'max')
+    expected = data.groupby(['Region', data['Date'].dt.strftime('%Y-%m')])['Units'].max()
+    assert by_month == expected.to_dict()
+    assert index.query('Date:quarter') == data.groupby(data['Date'].dt.to_period('Q').astype(str)).size().to_dict()
+
+
+def test_data_without_dimensions_is_not_indexed():
+    assert AggregateIndex.build(pd.DataFrame({'x': range(300), 'y': range(300)})) is None
+    assert AggregateIndex.build(pd.DataFrame({'id': [f"row {i}" for i in range(300)], 'y': range(300)})) is None
+
+
+def test_grain_of_daily_data_is_the_day_rollup():
+    index = AggregateIndex.build(weather())
+
+    assert index.grain() == ('Date:day',)
+    assert AggregateIndex.from_dict(json.loads(dumps(index.to_dict()))).grain() == ('Date:day',)
+
+
+def test_rows_finer_than_every_cube_have_no_grain():
+    assert AggregateIndex.build(sales()).grain() is None
+
+    # Unindexed text columns are not reproduced by any cube
+    data = weather()
+    data['Note'] = [f"note {i}" for i in range(len(data))]
+    assert AggregateIndex.build(data).grain() is None
+
+
+def test_summary_keeps_the_grain_cube_with_row_values():
+    data = weather()
+    index = AggregateIndex.build(data)
+
+    assert ['Date:day'] not in [cube["by"] for cube in index.summary(max_groups=60)]
+    day = next(cube for cube in index.summary(max_groups=60, keep=(('Date:day',),)) if cube["by"] == ['Date:day'])
+    assert day["keys"] == data['Date'].tolist()
+    assert day["measures"]["Temperature"] == {"value": data['Temperature'].tolist()}
+
+
+def test_prompt_keeps_daily_values_of_indexed_data():
+    agent = ChartAgent()
+    data = weather()
+    agent.set_data(data)
+
+    section = agent._create_data_section(data)
+
+    assert len(data) > MAX_PROMPT_ROWS
+    assert "AGGREGATES" in section and "Date:day has one row per group" in section
+    assert '"2023-12-31"' in section and "ORIGINAL DATA" not in section
+    # Rendered once per dataset
+    assert agent._create_data_section(data) is section
+
+
+def test_prompt_sends_aggregates_with_all_rows_when_no_cube_covers_them():
+    agent = ChartAgent()
+    data = sales(500)
+    agent.set_data(data)
+
+    section = agent._create_data_section(data)
+
+    assert "AGGREGATES" in section and "ORIGINAL DATA" in section
+    aggregates = section.split("AGGREGATES")[1].split("ORIGINAL DATA:")[0]
+    assert '"Region"' in aggregates and '"Date:month"' in aggregates
+    assert section.split("ORIGINAL DATA:")[1].count('"Region"') == len(data)
+
+
+def test_prompt_sends_aggregates_with_a_sample_of_large_data():
+    agent = ChartAgent()
+    data = sales(MAX_FULL_PROMPT_ROWS + 1)
+    agent.set_data(data)
+
+    section = agent._create_data_section(data)
+
+    assert "AGGREGATES" in section and "ORIGINAL DATA" not in section
+    assert f"SAMPLE DATA (first {PROMPT_SAMPLE_ROWS} of {len(data)} rows)" in section
+
+
+def test_small_data_is_sent_as_rows_only():
+    agent = ChartAgent()
+    data = sales(MAX_PROMPT_ROWS)
+    agent.set_data(data, index=AggregateIndex.build(data))
+
+    section = agent._create_data_section(data)
+
+    assert "AGGREGATES" not in section and "ORIGINAL DATA" in section
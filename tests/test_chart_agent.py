@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from src.agent.chart_agent import ChartAgent
+
+DATA = [{"Month": "Jan", "Revenue": 10}, {"Month": "Feb", "Revenue": 20}, {"Month": "Mar", "Revenue": 30}]
+COMPLETE = {"type": "bar", "data": {"labels": ["Jan", "Feb", "Mar"], "datasets": [{"label": "Revenue", "data": [10, 20, 30]}]}}
+
+
+def test_truncated_response_is_fixed(fake_replies):
+    # Cut off after two of the three values: it closes into a config that still matches the labels
+    truncated = '{"chart_config": {"type": "bar", "data": {"labels": ["Jan", "Feb"], "datasets": [{"label": "Revenue", "data": [10, 20'
+    agent = ChartAgent()
+    completions = fake_replies(agent, [(truncated, "length"), (json.dumps({"chart_config": COMPLETE}), "stop")])
+
+    result = asyncio.run(agent.process_command(DATA, "Revenue by month"))
+
+    assert result["chart_config"] == COMPLETE
+    assert len(completions.requests) == 2
+    assert "cut off at the token limit" in completions.requests[1]["messages"][-1]["content"]
+
+
+def test_complete_response_is_not_fixed(fake_replies):
+    agent = ChartAgent()
+    completions = fake_replies(agent, [(json.dumps({"chart_config": COMPLETE}), "stop")])
+
+    result = asyncio.run(agent.process_command(DATA, "Revenue by month"))
+
+    assert result["chart_config"] == COMPLETE
+    assert len(completions.requests) == 1
+
+
+def test_truncation_fix_gets_a_larger_token_limit(fake_replies):
+    truncated = '{"chart_config": {"type": "bar", "data": {"labels": ["Jan", "Feb", "Mar"], "datasets": [{"data": [10, 20'
+    agent = ChartAgent()
+    completions = fake_replies(agent, [(truncated, "length"), (json.dumps({"chart_config": COMPLETE}), "stop")])
+
+    asyncio.run(agent.process_command(DATA, "Revenue by month"))
+
+    fix_tier = agent.router.tiers[agent.router.large_tier]
+    assert completions.requests[1]["max_tokens"] > fix_tier.max_tokens
+
+
+def test_failed_fix_returns_no_chart(fake_replies):
+    truncated = '{"chart_config": {"type": "bar", "data": {"labels": ["Jan", "Feb"], "datasets": [{"label": "Revenue", "data": [10, 20'
+    agent = ChartAgent()
+    fake_replies(agent, [(truncated, "length"), (truncated, "length")])
+
+    result = asyncio.run(agent.process_command(DATA, "Revenue by month"))
+
+    assert result["chart_config"] is None
+    assert "too large" in result["candidate_questions"][0]
+    assert agent.current_config is None
+
+
+def test_invalid_config_is_not_returned_when_the_fix_fails(fake_replies):
+    invalid = json.dumps({"chart_config": {"type": "area", "data": {"datasets": []}}, "candidate_questions": ["Which column?"]})
+    agent = ChartAgent()
+    fake_replies(agent, [(invalid, "stop"), ("not json", "stop")])
+
+    result = asyncio.run(agent.process_command(DATA, "Revenue by month"))
+
+    assert result["chart_config"] is None
+    assert result["candidate_questions"] == ["Which column?"]
@@ -0,0 +1,51 @@
+from src.utils.chart_schema import validate_chart_config
+
+
+def chart(**overrides):
+    config = {
+        "type": "bar",
+        "data": {"labels": ["Jan", "Feb", "Mar"], "datasets": [{"label": "Revenue", "data": [1, 2, 3]}]},
+        "options": {}
+    }
+    config.update(overrides)
+    return config
+
+
+def test_valid_config_has_no_errors():
+    assert validate_chart_config(chart()) == []
+
+
+def test_missing_fields_are_reported():
+    assert validate_chart_config({"type": "bar"}) == ["chart_config.data is missing"]
+    assert validate_chart_config(chart(data={"datasets": [{"label": "Revenue"}]})) == [
+        "chart_config.data.datasets[0].data is missing"
+    ]
+
+
+def test_wrong_types_and_unknown_chart_types_are_reported():
+    assert validate_chart_config([]) == ["chart_config must be of type object"]
+    assert validate_chart_config(chart(options=[])) == ["chart_config.options must be of type object"]
+    assert validate_chart_config(chart(type="area"))[0].startswith("chart_config.type must be one of")
+
+
+def test_empty_datasets_are_reported():
+    assert validate_chart_config(chart(data={"labels": [], "datasets": []})) == [
+        "chart_config.data.datasets must contain at least 1 item(s)"
+    ]
+
+
+def test_datasets_must_match_the_labels():
+    config = chart(data={
+        "labels": ["Jan", "Feb", "Mar"],
+        "datasets": [{"label": "Revenue", "data": [1, 2, 3]}, {"label": "Units", "data": [4, 5]}]
+    })
+
+    assert validate_chart_config(config) == ["chart_config.data.datasets[1].data has 2 values for 3 labels"]
+
+
+def test_point_datasets_are_not_matched_against_labels():
+    config = chart(type="scatter", data={"datasets": [{"label": "Pairs", "data": [{"x": 1, "y": 2}]}]})
+    assert validate_chart_config(config) == []
+
+    config = chart(type="line", data={"labels": ["Jan"], "datasets": [{"data": [{"x": "Jan", "y": 1}, {"x": "Feb", "y": 2}]}]})
+    assert validate_chart_config(config) == []
@@ -0,0 +1,70 @@
+from src.agent.chart_agent import ChartAgent
+from src.agent.conversation_memory import ConversationMemory
+
+
+def bar_chart(title, values):
+    return {
+        "type": "bar",
+        "data": {"labels": [f"M{i}" for i in range(len(values))], "datasets": [{"label": "Revenue", "data": values}]},
+        "options": {"plugins": {"title": {"display": True, "text": title}}}
+    }
+
+
+def test_first_turn_records_creation_only():
+    memory = ConversationMemory()
+    memory.add_turn("revenue by month", bar_chart("Revenue", [1, 2, 3]))
+
+    assert memory.recent_turns[0]["delta"] == {"created": "bar chart"}
+
+
+def test_later_turns_store_only_changes():
+    memory = ConversationMemory()
+    memory.add_turn("revenue by month", bar_chart("Revenue", [1, 2, 3]))
+    memory.add_turn("rename it", bar_chart("Monthly revenue", [1, 2, 3]))
+
+    assert memory.recent_turns[1]["delta"] == {"set": {"options.plugins.title.text": "Monthly revenue"}}
+
+
+def test_old_turns_are_compacted_into_summaries():
+    memory = ConversationMemory(max_recent_turns=2)
+    for index in range(5):
+        memory.add_turn(f"title {index}", bar_chart(f"Title {index}", [1, 2, 3]))
+
+    assert len(memory.recent_turns) == 2
+    assert list(memory.summaries) == [
+        '"title 0" created a bar chart',
+        '"title 1" changed options.plugins.title.text',
+        '"title 2" changed options.plugins.title.text'
+    ]
+
+
+def test_render_stays_within_budget():
+    memory = ConversationMemory(max_tokens=60)
+    for index in range(10):
+        memory.add_turn(f"set the title to a long description number {index}", bar_chart(f"Title {index}", [index]))
+
+    rendered = memory.render()
+    assert memory.estimate_tokens(rendered) <= 60
+    assert "title to a long description number 9" in rendered
+
+
+def test_render_leaves_room_for_reserved_tokens():
+    memory = ConversationMemory(max_tokens=100)
+    for index in range(10):
+        memory.add_turn(f"set the title to a long description number {index}", bar_chart(f"Title {index}", [index]))
+
+    assert memory.estimate_tokens(memory.render(reserved_tokens=70)) <= 30
+    assert memory.render(reserved_tokens=100) == "none"
+
+
+def test_conversation_layers_respect_cap_with_large_previous_config():
+    agent = ChartAgent()
+    agent.memory = ConversationMemory(max_tokens=400)
+    config = bar_chart("Daily revenue", list(range(1000)))
+    agent.memory.add_turn("daily revenue", config)
+
+    previous_config, history = agent._create_conversation_layers(config)
+
+    assert "<1000 values>" in previous_config
+    tokens = agent.memory.estimate_tokens(previous_config) + agent.memory.estimate_tokens(history)
+    assert tokens <= 400
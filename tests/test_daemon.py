@@ -0,0 +1,97 @@
+import asyncio
+import json
+import socket
+import threading
+
+from src.agent.model_router import ModelRouter
+from src.api.daemon import DAEMON_OVERHEAD, ChartDaemon, DaemonClient
+from src.utils.session_store import SessionStore
+
+
+def advertise(store, port):
+    store.state_dir.mkdir(parents=True, exist_ok=True)
+    store.daemon_path.write_text(json.dumps({"host": "127.0.0.1", "port": port, "pid": 0, "token": "t"}))
+
+
+def serve_once(handle):
+    """Listen on a free port and pass the first accepted connection to handle"""
+    server = socket.create_server(("127.0.0.1", 0))
+
+    def run():
+        connection, _ = server.accept()
+        with connection:
+            connection.makefile('rb').readline()
+            handle(connection)
+        server.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server.getsockname()[1]
+
+
+def test_no_daemon_returns_none(tmp_path):
+    assert DaemonClient(SessionStore(str(tmp_path))).request("update_chart", command="x") is None
+
+
+def test_stale_daemon_file_returns_none(tmp_path):
+    store = SessionStore(str(tmp_path))
+    with socket.create_server(("127.0.0.1", 0)) as closed:
+        port = closed.getsockname()[1]
+    advertise(store, port)
+
+    assert DaemonClient(store).request("update_chart", command="x") is None
+
+
+def test_empty_reply_is_an_error(tmp_path):
+    store = SessionStore(str(tmp_path))
+    advertise(store, serve_once(lambda connection: None))
+
+    response = DaemonClient(store).request("update_chart", command="x")
+
+    assert response["status"] == "error"
+    assert "without answering" in response["detail"]
+
+
+def test_timeout_is_an_error(tmp_path):
+    store = SessionStore(str(tmp_path))
+    answered = threading.Event()
+    advertise(store, serve_once(lambda connection: answered.wait(5)))
+
+    response = DaemonClient(store, timeout=0.2).request("update_chart", command="x")
+    answered.set()
+
+    assert response["status"] == "error"
+    assert "did not answer" in response["detail"]
+
+
+def test_unexpected_failures_are_answered(tmp_path):
+    daemon = ChartDaemon(SessionStore(str(tmp_path)))
+
+    async def fail(command):
+        raise RuntimeError("agent crashed")
+    daemon.session.update_chart = fail
+
+    response = asyncio.run(daemon.handle_request({"action": "update_chart", "command": "x"}))
+
+    assert response == {"status": "error", "detail": "agent crashed"}
+
+
+def test_client_waits_for_the_slowest_escalation_path(tmp_path):
+    client = DaemonClient(SessionStore(str(tmp_path)))
+
+    assert client.timeout == ModelRouter().max_latency() + DAEMON_OVERHEAD
+
+
+def test_output_path_is_absolute(tmp_path, monkeypatch, fake_replies):
+    config = {"type": "bar", "data": {"labels": ["Jan"], "datasets": [{"label": "Revenue", "data": [10]}]}}
+    csv_path = tmp_path / "sales.csv"
+    csv_path.write_text("Month,Revenue\nJan,10\n")
+    monkeypatch.chdir(tmp_path)
+    daemon = ChartDaemon(SessionStore(str(tmp_path / "state")))
+    fake_replies(daemon.session.chart_agent, [(json.dumps({"chart_config": config}), "stop")])
+
+    response = asyncio.run(daemon.handle_request(
+        {"action": "process_file", "file_path": str(csv_path), "command": "Revenue by month"}
+    ))
+
+    assert response["status"] == "success"
+    assert response["output_path"] == str(tmp_path / "output" / "chart.html")
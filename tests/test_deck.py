@@ -0,0 +1,105 @@
+import asyncio
+import json
+import re
+
+from src.agent.chart_agent import ChartAgent
+
+DATA = [{"Month": "Jan", "Revenue": 10, "Units": 1}, {"Month": "Feb", "Revenue": 20, "Units": 2}]
+
+
+def chart(intent):
+    return {"type": "bar", "data": {"labels": ["Jan", "Feb"], "datasets": [{"label": intent, "data": [1, 2]}]}}
+
+
+def requested_intents(request):
+    """The numbered intents of a deck prompt"""
+    prompt = request["messages"][1]["content"]
+    return re.findall(r"^\d+\. (.+)$", prompt.split("SLIDE INTENTS:")[1], re.MULTILINE)
+
+
+def slide(intent, number=None):
+    slide = {"intent": intent, "chart_config": chart(intent), "candidate_questions": []}
+    if number is not None:
+        slide["index"] = number
+    return slide
+
+
+def labels(deck):
+    return [slide["chart_config"]["data"]["datasets"][0]["label"] if slide["chart_config"] else None for slide in deck["slides"]]
+
+
+def test_slides_keep_intent_order_across_batches(fake_replies):
+    def reply(request):
+        # Slides come back in reverse order, numbered within their batch
+        intents = requested_intents(request)
+        slides = [slide(intent, number) for number, intent in enumerate(intents, start=1)]
+        return json.dumps({"slides": slides[::-1]}), "stop"
+
+    agent = ChartAgent()
+    completions = fake_replies(agent, reply)
+    intents = [f"intent {i}" for i in range(6)]
+
+    deck = asyncio.run(agent.generate_deck(DATA, intents))
+
+    assert [slide["intent"] for slide in deck["slides"]] == intents
+    assert labels(deck) == intents
+    assert len(completions.requests) == 2
+
+
+def test_partial_reply_is_matched_by_intent(fake_replies):
+    def reply(request):
+        intents = requested_intents(request)
+        # The first reply skips intent a; the retry asks for it alone
+        returned = intents[1:] if len(intents) > 1 else intents
+        return json.dumps({"slides": [slide(intent) for intent in returned]}), "stop"
+
+    agent = ChartAgent()
+    completions = fake_replies(agent, reply)
+
+    deck = asyncio.run(agent.generate_deck(DATA, ["Revenue by month", "Units by month"]))
+
+    assert labels(deck) == ["Revenue by month", "Units by month"]
+    assert requested_intents(completions.requests[1]) == ["Revenue by month"]
+
+
+def test_slides_without_intents_fall_back_to_position(fake_replies):
+    slides = [{"chart_config": chart("first")}, {"chart_config": chart("second")}]
+    agent = ChartAgent()
+    fake_replies(agent, [(json.dumps({"slides": slides}), "stop")])
+
+    deck = asyncio.run(agent.generate_deck(DATA, ["a", "b"]))
+
+    assert labels(deck) == ["first", "second"]
+
+
+def test_truncated_last_slide_is_retried(fake_replies):
+    complete = json.dumps({"slides": [slide("a", 1), slide("b", 2)]})
+    # Cut inside the data of the second slide, which still closes into a valid config
+    truncated = complete[:complete.index('[1, 2]', complete.index('"b"')) + 2]
+    agent = ChartAgent()
+    completions = fake_replies(agent, [
+        (truncated, "length"),
+        (json.dumps({"slides": [slide("b", 1)]}), "stop")
+    ])
+
+    deck = asyncio.run(agent.generate_deck(DATA, ["a", "b"]))
+
+    assert labels(deck) == ["a", "b"]
+    assert requested_intents(completions.requests[1]) == ["b"]
+
+
+def test_failed_batch_keeps_the_other_batches(fake_replies):
+    def reply(request):
+        intents = requested_intents(request)
+        if "broken" in intents:
+            raise RuntimeError("rate limited")
+        return json.dumps({"slides": [slide(intent, number) for number, intent in enumerate(intents, start=1)]}), "stop"
+
+    agent = ChartAgent()
+    fake_replies(agent, reply)
+    intents = ["a", "b", "c", "d", "broken"]
+
+    deck = asyncio.run(agent.generate_deck(DATA, intents))
+
+    assert labels(deck) == ["a", "b", "c", "d", None]
+    assert "rate limited" in deck["slides"][4]["candidate_questions"][0]
@@ -0,0 +1,50 @@
+import pytest
+
+from src.utils.json_repair import REPAIRED, TRUNCATED, parse_json
+
+
+def test_valid_json_is_not_repaired():
+    assert parse_json('{"a": [1, 2]}') == ({"a": [1, 2]}, None)
+
+
+def test_markdown_fence_and_prose_are_stripped():
+    text = 'Here is the chart:\n```json\n{"chart_config": {"type": "bar"}}\n```\nLet me know!'
+
+    assert parse_json(text) == ({"chart_config": {"type": "bar"}}, REPAIRED)
+
+
+def test_comments_are_removed():
+    text = '{\n  "type": "line", // the chart type\n  /* no options yet */ "options": {}\n}'
+
+    assert parse_json(text) == ({"type": "line", "options": {}}, REPAIRED)
+
+
+def test_comment_markers_inside_strings_are_kept():
+    assert parse_json('{"url": "http://example.com/*x*/", }') == ({"url": "http://example.com/*x*/"}, REPAIRED)
+
+
+def test_trailing_commas_are_removed():
+    assert parse_json('{"data": [1, 2, 3,], "labels": ["a",],}') == ({"data": [1, 2, 3], "labels": ["a"]}, REPAIRED)
+
+
+def test_placeholders_are_removed():
+    assert parse_json('{"data": [1, 2, ...]}') == ({"data": [1, 2]}, REPAIRED)
+
+
+def test_truncated_document_is_closed_and_reported():
+    value, repair = parse_json('{"chart_config": {"type": "bar", "data": {"datasets": [{"data": [1, 2, 3')
+
+    assert value == {"chart_config": {"type": "bar", "data": {"datasets": [{"data": [1, 2, 3]}]}}}
+    assert repair == TRUNCATED
+
+
+def test_truncated_inside_a_key_falls_back_to_the_last_complete_value():
+    value, repair = parse_json('{"labels": ["a", "b"], "datasets": [{"label": "x", "da')
+
+    assert value == {"labels": ["a", "b"], "datasets": [{"label": "x"}]}
+    assert repair == TRUNCATED
+
+
+def test_unrepairable_content_raises():
+    with pytest.raises(ValueError):
+        parse_json("I could not build a chart for this request.")
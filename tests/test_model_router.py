@@ -0,0 +1,56 @@
+import pytest
+
+from src.agent.model_router import ModelRouter
+
+# Labeled requests: (command, dataset rows, edits an existing chart, expected tier)
+LABELED_REQUESTS = [
+    # Simple requests for the small tier
+    ("Make it a pie chart", 12, True, "small"),
+    ("Change the colors to blue", 12, True, "small"),
+    ("Remove the legend", 365, True, "small"),
+    ("Make it a pie chart", 5000, True, "small"),
+    ("Make the title bigger", 12, True, "small"),
+    ("Show monthly revenue as a bar chart", 12, False, "small"),
+    ("Plot temperature over time", 90, False, "small"),
+    ("Add units sold on secondary axis", 12, True, "small"),
+    ("Sort plans by subscribers", 8, True, "small"),
+    ("Only revenue for the first half of the year", 12, True, "small"),
+    ("Use a doughnut chart", 10, True, "small"),
+    # Complex requests for the large tier
+    ("Remove the legend", 365, False, "large"),
+    ("Plot temperature over time", 5000, False, "large"),
+    ("Show 7-day moving average", 365, True, "large"),
+    ("Total revenue by region", 12, False, "large"),
+    ("Revenue growth rate per month compared to units sold", 12, True, "large"),
+    ("Top 5 products by average satisfaction", 10, False, "large"),
+    ("Cumulative revenue share per region", 12, True, "large"),
+    ("Forecast next quarter's revenue from the monthly trend", 12, True, "large"),
+    ("Show the distribution of temperatures excluding outliers", 90, False, "large"),
+    ("Plot daily temperature, humidity and rainfall on one chart with humidity on a secondary "
+     "axis and rainfall as bars, using a separate color for each weekday", 90, False, "large"),
+]
+
+
+@pytest.mark.parametrize("command, rows, is_update, expected", LABELED_REQUESTS)
+def test_labeled_requests(command, rows, is_update, expected):
+    routing = ModelRouter().route(command, [{"x": 0}] * rows, is_update=is_update)
+
+    assert routing["tier"].name == expected, routing["reasons"]
+
+
+def test_timeout_escalates_to_the_large_tier():
+    router = ModelRouter()
+
+    assert router.escalate(router.tiers["small"]) is router.tiers["large"]
+    assert router.escalate(router.tiers["large"]) is None
+
+
+def test_max_latency_covers_escalation_and_fix():
+    # Small tier timeout, retry on the large tier, then a fix request on the large tier
+    assert ModelRouter().max_latency() == 30 + 60 + 60
+
+
+def test_max_latency_of_a_single_tier():
+    router = ModelRouter(tiers={"local": {"model": "llama3.1:8b", "timeout": 20}})
+
+    assert router.max_latency() == 20 + 20
@@ -0,0 +1,27 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.utils.serialization import dumps
+
+
+def test_non_finite_floats_are_written_as_null():
+    value = {"nan": float("nan"), "inf": np.float64("inf"), "series": np.array([1.5, np.nan])}
+
+    assert json.loads(dumps(value)) == {"nan": None, "inf": None, "series": [1.5, None]}
+
+
+def test_mixed_keys_are_sorted_as_strings():
+    assert dumps({2: "b", "a": 1, 1: "c"}, sort_keys=True) == b'{"1":"c","2":"b","a":1}'
+
+
+def test_pandas_values_are_converted():
+    value = {
+        "when": pd.Timestamp("2024-01-31"),
+        "missing": pd.NaT,
+        "count": np.int64(3),
+        "index": pd.Index(["x", "y"])
+    }
+
+    assert json.loads(dumps(value)) == {"when": "2024-01-31T00:00:00", "missing": None, "count": 3, "index": ["x", "y"]}
@@ -0,0 +1,80 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from src.agent.chart_session import ChartSession
+from src.utils.session_store import SessionStore
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CONFIG = {"type": "line", "data": {"labels": ["Jan", "Feb", "Mar"], "datasets": [{"label": "Revenue", "data": [10, 20, 30]}]}}
+
+# Restores the saved session in a new interpreter, with no dataset or index loaded in memory
+RESTORE_SCRIPT = """
+import json, sys
+from src.agent.chart_session import ChartSession
+from src.utils.session_store import SessionStore
+
+session = ChartSession(SessionStore(sys.argv[1]))
+session.restore()
+agent = session.chart_agent
+print(json.dumps({
+    "revision": session.revision,
+    "rows": len(agent.current_data),
+    "indexed": agent.current_index is not None,
+    "current_config": agent.current_config,
+    "turns": [turn["command"] for turn in agent.memory.recent_turns]
+}))
+"""
+
+
+def create_session(tmp_path, fake_replies):
+    csv_path = tmp_path / "sales.csv"
+    csv_path.write_text("Month,Revenue\nJan,10\nFeb,20\nMar,30\n")
+    session = ChartSession(SessionStore(str(tmp_path / "state")))
+    fake_replies(session.chart_agent, [(json.dumps({"chart_config": CONFIG}), "stop")])
+    data = session.load_file(str(csv_path))
+    asyncio.run(session.process_command(data, "Revenue by month"))
+    return session
+
+
+def test_session_is_restored_in_a_fresh_process(tmp_path, fake_replies):
+    create_session(tmp_path, fake_replies)
+
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    output = subprocess.run(
+        [sys.executable, "-c", RESTORE_SCRIPT, str(tmp_path / "state")],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    restored = json.loads(output.strip().splitlines()[-1])
+
+    assert restored == {
+        "revision": 1,
+        "rows": 3,
+        "indexed": True,
+        "current_config": CONFIG,
+        "turns": ["Revenue by month"]
+    }
+
+
+def test_dataset_is_reloaded_from_source_when_cache_is_cleared(tmp_path, fake_replies):
+    session = create_session(tmp_path, fake_replies)
+    for cached in (tmp_path / "state" / "datasets").iterdir():
+        cached.unlink()
+
+    restored = ChartSession(SessionStore(str(tmp_path / "state")))
+    restored.restore()
+
+    assert restored.fingerprint == session.fingerprint
+    assert restored.chart_agent.current_config == CONFIG
+
+
+def test_saving_increments_the_revision(tmp_path):
+    store = SessionStore(str(tmp_path))
+
+    assert store.load_session() is None
+    assert store.save_session({"fingerprint": "a"})["revision"] == 1
+    assert store.save_session({"fingerprint": "b"}) == {"fingerprint": "b", "revision": 2}
+    assert store.load_session()["revision"] == 2
@@ -0,0 +1,73 @@
+import pytest
+
+from src.agent.topic_manager import TopicManager
+
+# Labeled commands: (command that created the chart, chart title, dataset labels, next command, is new topic)
+LABELED_COMMANDS = [
+    # Refinements of the current chart
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "Add units sold on secondary axis", False),
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "Show quarterly totals instead of monthly", False),
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "Make it a stacked bar chart by region", False),
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "as a pie chart", False),
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "Change the colors to blue", False),
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "Revenue growth rate per month", False),
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "Only revenue for the first half of the year", False),
+    ("Plot temperature over time", "Daily Temperature", ["Temperature"], "Add humidity as line chart", False),
+    ("Plot temperature over time", "Daily Temperature", ["Temperature"], "Show 7-day moving average", False),
+    ("Plot temperature over time", "Daily Temperature", ["Temperature"], "Monthly average temperature", False),
+    ("Plot temperature over time", "Daily Temperature", ["Temperature"], "Remove the legend", False),
+    ("Compare product metrics in radar chart", "Product Metrics", ["Satisfaction", "Value"], "Show quarterly sales trends for these products", False),
+    ("Compare product metrics in radar chart", "Product Metrics", ["Satisfaction", "Value"], "Use a doughnut chart", False),
+    ("Compare product metrics in radar chart", "Product Metrics", ["Satisfaction", "Value"], "Product satisfaction scores only", False),
+    ("Subscriptions by plan", "Subscriptions by Plan", ["Subscribers"], "Sort plans by subscribers", False),
+    ("Subscriptions by plan", "Subscriptions by Plan", ["Subscribers"], "Make the title bigger", False),
+    # Switches to a different subject
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "Units sold by region", True),
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "Start over with a new chart", True),
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "Let's look at different data", True),
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "Customer churn per plan", True),
+    ("Plot temperature over time", "Daily Temperature", ["Temperature"], "Rainfall distribution histogram", True),
+    ("Plot temperature over time", "Daily Temperature", ["Temperature"], "Wind speed by weekday", True),
+    ("Plot temperature over time", "Daily Temperature", ["Temperature"], "Forget that, something else please", True),
+    ("Compare product metrics in radar chart", "Product Metrics", ["Satisfaction", "Value"], "Revenue by region", True),
+    ("Compare product metrics in radar chart", "Product Metrics", ["Satisfaction", "Value"], "New project: employee headcount", True),
+    ("Subscriptions by plan", "Subscriptions by Plan", ["Subscribers"], "Monthly revenue growth", True),
+    ("Subscriptions by plan", "Subscriptions by Plan", ["Subscribers"], "Temperature trend in 2023", True),
+    ("Subscriptions by plan", "Subscriptions by Plan", ["Subscribers"], "Let's start from scratch", True),
+    # Switches phrased with words that usually refer back to the chart
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "Make a chart of customer churn per plan", True),
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "Can you add a chart of employee headcount by department", True),
+    ("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"], "Now show temperature trend this year", True),
+    ("Plot temperature over time", "Daily Temperature", ["Temperature"], "Also show support tickets by priority and channel", True),
+    ("Subscriptions by plan", "Subscriptions by Plan", ["Subscribers"], "Change this to revenue by region and product line", True),
+]
+
+
+def build_manager(topic_command, title, dataset_labels):
+    """Create a TopicManager whose current topic is the described chart"""
+    manager = TopicManager()
+    manager.set_topic(topic_command, {
+        "type": "bar",
+        "data": {"labels": [], "datasets": [{"label": label, "data": []} for label in dataset_labels]},
+        "options": {"plugins": {"title": {"display": True, "text": title}}}
+    })
+    return manager
+
+
+@pytest.mark.parametrize("topic_command, title, dataset_labels, command, expected", LABELED_COMMANDS)
+def test_labeled_commands(topic_command, title, dataset_labels, command, expected):
+    manager = build_manager(topic_command, title, dataset_labels)
+    assert manager.is_new_topic(command) == expected
+
+
+def test_no_current_topic_is_not_a_change():
+    assert TopicManager().is_new_topic("Units sold by region") is False
+
+
+def test_state_round_trip_keeps_topic():
+    manager = build_manager("Show monthly revenue as a bar chart", "Monthly Revenue", ["Revenue"])
+    restored = TopicManager()
+    restored.restore(manager.to_dict())
+
+    assert restored.is_new_topic("Revenue growth rate per month") is False
+    assert restored.is_new_topic("Customer churn per plan") is True